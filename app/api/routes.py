@@ -1,22 +1,32 @@
 from typing import Annotated
-from fastapi import Depends, FastAPI, HTTPException, status, APIRouter, UploadFile, File, Form, Request
+from fastapi import Depends, HTTPException, status, APIRouter, UploadFile, File, Form, Query, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import datetime, timedelta, timezone
 from .utility import auth, rag, user
 from app.models import schemas
-from app.core import database
+from app.core import database, metrics
+from sqlalchemy import select, or_
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pathlib import Path
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 import os
 import shutil
 import tempfile
+import asyncio
+import json
 from dotenv import load_dotenv
 from slowapi import Limiter
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 from app.models import users 
-from app.core.security import hash_password  
+from app.core.security import hash_password_async
+from app.services.job_queue import job_queue, QueueFullError
+from app.services.model_registry import registry, warmup_names
+from app.services.cache import answer_cache
+from app.services.rag_service import role_based_answer, stream_role_based_response
+from app.services import admission, document_store, inference_worker, lifecycle
 import logging
 
 # Set up logging
@@ -28,20 +38,83 @@ load_dotenv()
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
 router = APIRouter()
-app = FastAPI()
 limiter = Limiter(key_func=get_remote_address)
 get_db = database.get_db
+get_async_db = database.get_async_db
 
-@app.exception_handler(RateLimitExceeded)
+# Registered on the application in main.py
 async def ratelimit(request, exc):
-    return {"error": "Rate limit exceeded, try again later"}
+    metrics.RATE_LIMIT_REJECTIONS.labels(request.url.path).inc()
+    return JSONResponse(
+        content={"error": "Rate limit exceeded, try again later"},
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS
+    )
+
+# Upload endpoints covered by admission control
+UPLOAD_PATHS = ("/upload/", "/upload/stream", "/documents")
+
+def overloaded(request, exc):
+    """503 with Retry-After for uploads shed by admission control or a full job queue."""
+    metrics.ADMISSION_REJECTIONS.labels(request.url.path).inc()
+    return JSONResponse(
+        content={"detail": str(exc)},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+async def precheck_upload(request):
+    """
+    Sheds an upload from its Content-Length before the body is read, when even the
+    cheapest file type of that size would not fit the admission budget.
+    
+    """
+    content_length = request.headers.get("content-length")
+    if not content_length or not content_length.isdigit():
+        return None
+    try:
+        await run_in_threadpool(admission.check, admission.min_upload_cost(int(content_length)))
+    except admission.OverloadedError as e:
+        return overloaded(request, e)
+    return None
+
+@router.get("/ready")
+async def ready():
+    models = registry.status()
+    is_ready = all(models.get(name, {}).get("loaded") for name in warmup_names())
+    content = {"ready": is_ready, "models": models}
+    if inference_worker.enabled():
+        content["inference_worker"] = await run_in_threadpool(inference_worker.health)
+        content["ready"] = is_ready = is_ready and content["inference_worker"]["reachable"]
+    return JSONResponse(
+        content=content,
+        status_code=status.HTTP_200_OK if is_ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
+
+@router.get("/stats")
+async def stats():
+    stats = {
+        "answer_cache": answer_cache.stats(),
+        "auth_cache": auth.user_cache.stats(),
+        "db_pool": database.pool_stats(),
+        "admission": admission.limiter.usage(),
+    }
+    if registry.is_loaded("embedding") and hasattr(registry.get("embedding"), "stats"):
+        stats["embedding"] = registry.get("embedding").stats()
+    if inference_worker.enabled():
+        stats["inference_worker"] = await run_in_threadpool(inference_worker.health)
+    return stats
 
 @router.post("/login_token")
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> schemas.Token:
-    user_obj = auth.authenticate_user(db, form_data.username, form_data.password)
+    user_obj = await auth.authenticate_user(db, form_data.username, form_data.password)
     if not user_obj:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -59,34 +132,59 @@ async def login_for_access_token(
 @limiter.limit("10/minute")
 async def read_users_me(
     request: Request,
-    current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)],
-    db: Session = Depends(get_db)
+    current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)]
 ):
     logger.info(f"Received request to /users/me from {request.client.host}")
     logger.info(f"Current user: {current_user.username}")
     return current_user
 
 @router.post("/user_create", response_model=schemas.UserResponse)
-async def create_user(user: schemas.User, db: Session = Depends(get_db)):
+async def create_user(user: schemas.User, db: AsyncSession = Depends(get_async_db)):
     # Check for existing user
-    if db.query(users.User).filter(users.User.username == user.username).first():
-        raise HTTPException(status_code=400, detail="Username already taken")
-    if db.query(users.User).filter(users.User.email == user.email).first():
-        raise HTTPException(status_code=400, detail="Email already registered")
+    result = await db.execute(
+        select(users.User.username, users.User.email)
+        .where(or_(users.User.username == user.username, users.User.email == user.email))
+    )
+    for username, email in result.all():
+        if username == user.username:
+            raise HTTPException(status_code=400, detail="Username already taken")
+        if email == user.email:
+            raise HTTPException(status_code=400, detail="Email already registered")
     
     db_user = users.User(
         username=user.username,
         email=user.email,
-        password=hash_password(user.password), 
+        password=await hash_password_async(user.password), 
         base_role=user.base_role,
         auth_role="user",  
         is_deleted=False   
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return schemas.UserResponse.from_orm(db_user)
 
+@router.post("/users/bulk", response_model=schemas.BulkUserImportResponse)
+async def bulk_create_users(
+    batch: schemas.BulkUserImport,
+    admin: Annotated[schemas.User, Depends(auth.get_current_admin_user)],
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Creates up to 1000 users in one transaction; rows that fail are listed in errors."""
+    return await user.bulk_create(batch.users, db)
+
+@router.get("/users", response_model=schemas.UserPage)
+async def list_users(
+    admin: Annotated[schemas.User, Depends(auth.get_current_admin_user)],
+    after: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    include_deleted: bool = False,
+    email: str | None = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Users ordered by username; pass next_cursor as after to get the following page."""
+    return await user.list_users(db, after, limit, include_deleted, email)
+
 @router.post("/user/logout")
 async def logout():
     return {"message": "Logged out"}
@@ -96,10 +194,10 @@ async def update_user(
     id: int,
     user: schemas.User,
     current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Fetch the existing user
-    db_user = db.query(users.User).filter(users.User.id == id).first()
+    db_user = await db.get(users.User, id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -107,25 +205,66 @@ async def update_user(
     if db_user.username != current_user.username and current_user.auth_role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to update this user")
     
+    old_username = db_user.username
     db_user.username = user.username
     db_user.email = user.email
     db_user.base_role = user.base_role
     if user.password:  
-        db_user.password = hash_password(user.password)
+        db_user.password = await hash_password_async(user.password)
     
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    # After the commit, so a concurrent request cannot re-cache the old row
+    auth.invalidate_user(old_username)
+    await db.refresh(db_user)
     return schemas.User.from_orm(db_user)
 
 @router.delete("/delete/user/{id}")
 async def delete_user(
     id: int,
     current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return user.del_user(id, db)
+    # Deleting a user also deletes all of their documents and vectors
+    if current_user.id != id and current_user.auth_role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to delete this user")
+    return await user.del_user(id, db)
 
-@router.post("/upload/")
+def save_temp_upload(file: UploadFile, role: str):
+    """Copies an upload to a temp file, removed by the job once processing finishes."""
+    file_extension = Path(file.filename).suffix
+    with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
+        shutil.copyfileobj(file.file, temp_file)
+    metrics.UPLOAD_BYTES.labels(file_extension.lower(), role).inc(os.path.getsize(temp_file.name))
+    return temp_file.name, file_extension
+
+def submit_upload(owner, temp_file_path, file_extension, func, *args, **kwargs):
+    """
+    Admits an upload by its cost, then queues its job. The admission lease is held
+    until the job finishes. Raises OverloadedError, also when the job queue is full.
+    
+    """
+    cost = admission.upload_cost(file_extension, os.path.getsize(temp_file_path))
+    lease = admission.admit(cost)
+    try:
+        return job_queue.submit(owner, admission.release_after(lease, func), *args, **kwargs)
+    except QueueFullError:
+        admission.limiter.release(lease)
+        raise admission.OverloadedError(admission.queue_retry_after(cost))
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_answer(question, role, owner_id, document_id=None):
+    """SSE "token" events from the LLM followed by a "sources" event."""
+    try:
+        answer_events = stream_role_based_response(question, role, owner_id, document_id)
+        async for event, data in iterate_in_threadpool(answer_events):
+            yield sse_event(event, data)
+    except Exception as e:
+        logger.exception("Streaming answer failed")
+        yield sse_event("error", {"detail": str(e)})
+
+@router.post("/upload/", status_code=status.HTTP_202_ACCEPTED)
 @limiter.limit("3/minute")
 async def upload_file(
     request: Request,
@@ -135,21 +274,192 @@ async def upload_file(
 ):
     try:
         current_user_role = current_user.base_role
-        file_extension = Path(file.filename).suffix
-
-        # Temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_file_path = temp_file.name
-        
-        # Call RAG pipeline for processing
+        temp_file_path, file_extension = await run_in_threadpool(save_temp_upload, file, current_user.base_role)
+
+        # Queue the RAG pipeline so the event loop is not blocked by OCR/transcription/embedding
         try:
-            transcription = rag.rag_response(temp_file_path, question, file_extension, current_user_role)
-        
-        finally:
+            job = await run_in_threadpool(
+                submit_upload, current_user.username, temp_file_path, file_extension, rag.rag_job,
+                temp_file_path, question, file_extension, current_user_role, current_user.id, file.filename
+            )
+        except admission.OverloadedError as e:
             os.remove(temp_file_path)
+            return overloaded(request, e)
 
-        return JSONResponse(content={"generated_answer": transcription})
+        return JSONResponse(content=job.to_dict(), status_code=status.HTTP_202_ACCEPTED)
 
     except Exception as e:
-        return JSONResponse(content={"detail": str(e)}, status_code=400)
\ No newline at end of file
+        return JSONResponse(content={"detail": str(e)}, status_code=400)
+
+@router.post("/upload/stream")
+@limiter.limit("3/minute")
+async def upload_file_stream(
+    request: Request,
+    current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)],
+    file: UploadFile = File(...),
+    question: str = Form(...)
+):
+    """
+    Server-sent-events variant of /upload/: emits "stage" events while the file is
+    ingested, "token" events as the answer is generated, then "sources" and "done".
+    
+    """
+    current_user_role = current_user.base_role
+    temp_file_path, file_extension = await run_in_threadpool(save_temp_upload, file, current_user.base_role)
+
+    try:
+        job = await run_in_threadpool(
+            submit_upload, current_user.username, temp_file_path, file_extension, rag.ingest_job,
+            temp_file_path, file_extension, current_user_role, current_user.id, file.filename
+        )
+    except admission.OverloadedError as e:
+        os.remove(temp_file_path)
+        return overloaded(request, e)
+
+    async def events():
+        last_stage = None
+        while not job.done:
+            if job.stage != last_stage:
+                last_stage = job.stage
+                yield sse_event("stage", {"job_id": job.id, "stage": job.stage, "progress": job.progress})
+            await asyncio.sleep(0.25)
+
+        if job.stage == "failed":
+            yield sse_event("error", {"detail": job.error})
+            return
+
+        yield sse_event("stage", {"job_id": job.id, "stage": "answering", "progress": 0.8})
+        async for event in stream_answer(question, current_user_role, current_user.id):
+            yield event
+        yield sse_event("done", {"job_id": job.id})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def document_response(document):
+    return schemas.DocumentResponse(
+        id=document.id,
+        filename=document.filename,
+        file_type=document.file_type,
+        base_role=document.base_role,
+        chunk_count=len(document.chunk_ids or []),
+        created_at=document.created_at,
+        expires_at=document.expires_at,
+    )
+
+@router.post("/documents", status_code=status.HTTP_202_ACCEPTED, response_model=schemas.JobStatus)
+@limiter.limit("3/minute")
+async def upload_document(
+    request: Request,
+    current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)],
+    file: UploadFile = File(...),
+    ttl_seconds: int | None = Form(None, ge=0)
+):
+    """
+    Ingests a document without asking a question; the job result carries its document_id.
+    ttl_seconds overrides the user's default document TTL (0 keeps it until deleted).
+    
+    """
+    temp_file_path, file_extension = await run_in_threadpool(save_temp_upload, file, current_user.base_role)
+    try:
+        job = await run_in_threadpool(
+            submit_upload, current_user.username, temp_file_path, file_extension, rag.ingest_job,
+            temp_file_path, file_extension, current_user.base_role, current_user.id, file.filename,
+            ttl_seconds=ttl_seconds
+        )
+    except admission.OverloadedError as e:
+        os.remove(temp_file_path)
+        return overloaded(request, e)
+    return job.to_dict()
+
+@router.get("/documents", response_model=list[schemas.DocumentResponse])
+def list_documents(
+    current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)],
+    db: Session = Depends(get_db)
+):
+    return [document_response(document) for document in document_store.list_documents(db, current_user.id)]
+
+@router.get("/documents/retention", response_model=schemas.RetentionPolicy)
+def get_retention(
+    current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)],
+    db: Session = Depends(get_db)
+):
+    return schemas.RetentionPolicy(document_ttl_seconds=lifecycle.tenant_ttl(db, current_user.id))
+
+@router.put("/documents/retention", response_model=schemas.RetentionPolicy)
+def set_retention(
+    policy: schemas.RetentionPolicy,
+    current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)],
+    db: Session = Depends(get_db)
+):
+    """Sets the default TTL of the user's future uploads (None restores the server default)."""
+    lifecycle.set_tenant_ttl(db, current_user.id, policy.document_ttl_seconds)
+    return schemas.RetentionPolicy(document_ttl_seconds=lifecycle.tenant_ttl(db, current_user.id))
+
+@router.get("/documents/{document_id}", response_model=schemas.DocumentResponse)
+def get_document(
+    document_id: str,
+    current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)],
+    db: Session = Depends(get_db)
+):
+    document = document_store.get_document(db, current_user.id, document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return document_response(document)
+
+@router.delete("/documents/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_document(
+    document_id: str,
+    current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)],
+    db: Session = Depends(get_db)
+):
+    """Deletes a document with its vectors, lexical index entries and cached answers."""
+    document = document_store.get_document(db, current_user.id, document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    lifecycle.delete_document(db, document)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+async def answer(ask: schemas.AskRequest, current_user: schemas.User, document_id=None):
+    if ask.stream:
+        return StreamingResponse(
+            stream_answer(ask.question, current_user.base_role, current_user.id, document_id),
+            media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+        )
+    return await run_in_threadpool(
+        role_based_answer, ask.question, current_user.base_role, current_user.id, document_id
+    )
+
+@router.post("/documents/{document_id}/ask", response_model=schemas.AskResponse)
+@limiter.limit("20/minute")
+async def ask_document(
+    request: Request,
+    document_id: str,
+    ask: schemas.AskRequest,
+    current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)],
+    db: Session = Depends(get_db)
+):
+    """Answers a question from one already-ingested document: retrieval and generation only."""
+    document = await run_in_threadpool(document_store.get_document, db, current_user.id, document_id)
+    if not document or not document.chunk_ids:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return await answer(ask, current_user, document_id)
+
+@router.post("/ask", response_model=schemas.AskResponse)
+@limiter.limit("20/minute")
+async def ask_corpus(
+    request: Request,
+    ask: schemas.AskRequest,
+    current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)]
+):
+    """Answers a question from all of the user's ingested documents."""
+    return await answer(ask, current_user)
+
+@router.get("/jobs/{job_id}", response_model=schemas.JobStatus)
+async def get_job(
+    job_id: str,
+    current_user: Annotated[schemas.User, Depends(auth.get_current_active_user)],
+):
+    job = job_queue.get(job_id)
+    if not job or job.owner != current_user.username:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
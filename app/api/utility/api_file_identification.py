@@ -1,28 +1,71 @@
-from app.services.ocr_service import ocr_path
-from app.services.summarization import extract_pdf_text
+from app.services.extraction import extract_sections, extraction_stage
 from app.services.embedding_service import embedding_vectorstore
-from app.services.transcription import transcribe_audio
+from app.services import admission, document_store, lifecycle
+from app.core.database import SessionLocal
+from app.core import metrics
+import logging
 import os
 
-def file_identification(filepath, file_extension):
+logger = logging.getLogger(__name__)
+
+def normalize_extension(file_extension):
     if isinstance(file_extension, bytes):
         file_extension = file_extension.decode('utf-8', errors='ignore')
     elif not isinstance(file_extension, str):
         raise ValueError(f"Invalid file_extension type: {type(file_extension)}")
+    return file_extension.lower()
+
+def ingest_document(filepath, file_extension, owner_id, base_role, filename=None, progress=None, ttl_seconds=None, sections=None):
+    """
+    Extracts and embeds a file for its owner and returns its Document.
+    Files the owner has already processed are looked up by the hash of their bytes.
+    ttl_seconds overrides the owner's default document TTL; sections are
+    (section, text) pairs already extracted elsewhere (e.g. by app.bulk_ingest).
     
-    file_extension = file_extension.lower()
-    print(f"Debug - filepath: {filepath}, file_extension: {file_extension}")
-    
-    if file_extension in [".img", ".png", ".jpg", ".jpeg"]:
-        data = ocr_path(filepath)
-        embedding_vectorstore(data)
-        return data
-    elif file_extension in [".mp3", ".wav"]:
-        data = transcribe_audio(filepath)
-        embedding_vectorstore(data)
-        return data
-    elif file_extension == ".pdf":
-        data = extract_pdf_text(filepath)
-        embedding_vectorstore(data)
+    """
+    file_extension = normalize_extension(file_extension)
+    logger.debug(f"Ingesting {filepath} ({file_extension})")
+
+    content_hash = document_store.file_sha256(filepath)
+    db = SessionLocal()
+    try:
+        expires_at = lifecycle.expiry(db, owner_id, ttl_seconds)
+        document = document_store.get_or_create(db, owner_id, base_role, content_hash, file_extension, filename, expires_at)
+        if document.chunk_ids:
+            logger.debug(f"Reusing {len(document.chunk_ids)} embedded chunks for {content_hash}")
+            db.expunge(document)
+            return document
+
+        if progress:
+            progress("extracting", 0.1)
+
+        if document.text:
+            sections = [(None, document.text)]
+        elif sections is None:
+            stage = extraction_stage(file_extension)
+            # Waiting for a free OCR/transcription slot is not charged to the stage's timing
+            sections = admission.limited_iter(
+                stage, metrics.timed_iter(extract_sections(filepath, file_extension), stage, file_extension, base_role)
+            )
+
+        # Keep the extracted text for the content-hash cache as sections stream past
+        texts = []
+        def collect(sections):
+            for section, text in sections:
+                texts.append(text)
+                yield section, text
+
+        stored = embedding_vectorstore(
+            collect(sections), owner_id, base_role, document.id, progress=progress, file_type=file_extension
+        )
+        document = document_store.save_document(db, document, "\n".join(texts), stored["chunk_ids"])
+        db.expunge(document)
+        return document
+    finally:
+        db.close()
+
+def file_identification(filepath, file_extension, owner_id, base_role, filename=None, progress=None):
+    document = ingest_document(filepath, file_extension, owner_id, base_role, filename, progress)
+    if document.file_type == ".pdf":
         return {"successfully processed"}
-    raise ValueError(f"unsupported file type: {file_extension}")
\ No newline at end of file
+    return document.text
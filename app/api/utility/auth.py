@@ -1,12 +1,14 @@
 from typing import Annotated
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import users  
 from app.core import database  
-from app.core.security import verify_password
+from app.core.security import verify_password_async
 from app.models import schemas 
 from app.core.config import SETTINGS
+from app.services.cache import StatsCache
 from datetime import datetime, timedelta, timezone
 import jwt
 from jwt.exceptions import InvalidTokenError
@@ -18,15 +20,22 @@ logger = logging.getLogger(__name__)
 # Use OAuth2PasswordBearer to extract the token from the Authorization header
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login_token")
 
-get_db = database.get_db
+get_db = database.get_async_db
 
-def get_user(db: Session, username: str):
-    user = db.query(users.User).filter(users.User.username == username).first()
-    return user
+# Resolved users keyed by (username, token); short TTL bounds staleness across workers
+user_cache = StatsCache("auth_user", SETTINGS.auth_cache_size, SETTINGS.auth_cache_ttl)
+
+def invalidate_user(username: str):
+    """Drops cached principals for a user after it is updated or deleted."""
+    user_cache.invalidate(lambda key: key[0] == username)
+
+async def get_user(db: AsyncSession, username: str):
+    result = await db.execute(select(users.User).where(users.User.username == username))
+    return result.scalars().first()
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
-    if not user or not verify_password(password, user.password):
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user(db, username)
+    if not user or not await verify_password_async(password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
@@ -43,7 +52,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     logger.debug(f"Created token with payload: {to_encode}")
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -59,15 +68,29 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except InvalidTokenError as e:
         logger.error(f"Token validation failed: {str(e)}")
         raise credentials_exception
-    user = get_user(db, username=token_data.username)
+    cache_key = (token_data.username, token)
+    cached_user = user_cache.get(cache_key)
+    if cached_user is not None:
+        return cached_user
+
+    user = await get_user(db, username=token_data.username)
     if user is None:
         logger.error(f"User not found: {token_data.username}")
         raise credentials_exception
-    return schemas.User.from_orm(user)
+    current_user = schemas.User.from_orm(user)
+    user_cache.set(cache_key, current_user)
+    return current_user
 
 async def get_current_active_user(
     current_user: Annotated[schemas.User, Depends(get_current_user)],
 ):
     if not current_user:
         raise HTTPException(status_code=404, detail="User not found")
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_admin_user(
+    current_user: Annotated[schemas.User, Depends(get_current_active_user)],
+):
+    if current_user.auth_role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
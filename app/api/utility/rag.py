@@ -1,14 +1,38 @@
-from .api_file_identification import file_identification
+import os
+from .api_file_identification import file_identification, ingest_document
 from app.services.rag_service import role_based_response
 
-def rag_response(filepath, query, file_extension, current_user_role):
+def rag_response(filepath, query, file_extension, current_user_role, owner_id, filename=None, progress=None):
     try:
-        is_valid = file_identification(filepath, file_extension) 
+        is_valid = file_identification(filepath, file_extension, owner_id, current_user_role, filename, progress=progress)
         
         if not is_valid:
             return {"error": "Unsupported file type"}
 
-        return role_based_response(query, current_user_role)  
+        if progress:
+            progress("answering", 0.8)
+
+        return role_based_response(query, current_user_role, owner_id)
 
     except Exception as e:
         return {"error": str(e)} 
+
+def rag_job(filepath, query, file_extension, current_user_role, owner_id, filename=None, progress=None):
+    """Background job body for /upload: runs the pipeline and removes the temp file."""
+    try:
+        answer = rag_response(filepath, query, file_extension, current_user_role, owner_id, filename, progress=progress)
+    finally:
+        os.remove(filepath)
+    if isinstance(answer, dict) and "error" in answer:
+        return answer
+    return {"generated_answer": answer}
+
+def ingest_job(filepath, file_extension, current_user_role, owner_id, filename=None, progress=None, ttl_seconds=None):
+    """Background job body for ingestion-only uploads (/documents, /upload/stream)."""
+    try:
+        document = ingest_document(
+            filepath, file_extension, owner_id, current_user_role, filename, progress=progress, ttl_seconds=ttl_seconds
+        )
+    finally:
+        os.remove(filepath)
+    return {"status": "ingested", "document_id": document.id}
@@ -1,25 +1,31 @@
 from app.models import users
 from app.models import schemas
-from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core import security
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from app.services import lifecycle
+from . import auth
 
-def create(request: schemas.User, db:Session):
-    dbuser = db.query(users.User).filter(users.User.username==request.username).first()
-    new_user = users.User(username=request.username, email=request.email, password=security.hash_password(request.password),base_role=request.base_role,auth_role="user")
-    if not new_user:
-        raise HTTPException(status_code=422,detail="Unprocessable entity")
+async def create(request: schemas.User, db:AsyncSession):
+    result = await db.execute(select(users.User).where(users.User.username==request.username))
+    dbuser = result.scalars().first()
     if dbuser:
         raise HTTPException(status_code=409,detail="User already exists")
+    new_user = users.User(username=request.username, email=request.email, password=await security.hash_password_async(request.password),base_role=request.base_role,auth_role="user")
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
-def update_old_user(id,user:schemas.User,db:Session):
-    dbuser = db.query(users.User).filter(users.User.id==id).first()
+async def update_old_user(id,user:schemas.User,db:AsyncSession):
+    dbuser = await db.get(users.User, id)
     if not dbuser:
         return None
+    old_username = dbuser.username
     if user.username:
         dbuser.username = user.username
     if user.password:
@@ -28,16 +34,120 @@ def update_old_user(id,user:schemas.User,db:Session):
         dbuser.base_role = user.base_role
     if user.email:
         dbuser.email = user.email
-    db.commit()
-    db.refresh(dbuser)
+    await db.commit()
+    auth.invalidate_user(old_username)
+    await db.refresh(dbuser)
     return dbuser
 
-def del_user(id:int, db:Session):
-    user=db.query(users.User).filter(users.User.id==id)
-    if not user.first:
+async def del_user(id:int, db:AsyncSession):
+    dbuser = await db.get(users.User, id)
+    if not dbuser:
         raise HTTPException(status_code=404,
                             detail=f"user with {id} not found")
     
-    user.delete(synchronize_session=False)
-    db.commit()
-    return f'User with Id {id} deleted'
\ No newline at end of file
+    username = dbuser.username
+    await db.delete(dbuser)
+    await db.commit()
+    auth.invalidate_user(username)
+    # Cascade to the user's documents, vectors and lexical index
+    await run_in_threadpool(lifecycle.delete_tenant, id)
+    return f'User with Id {id} deleted'
+
+def validation_detail(error: ValidationError):
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+
+BASE_ROLES = {role.value for role in schemas.BaseRole}
+
+async def bulk_create(rows: list[dict], db: AsyncSession):
+    """
+    Creates a batch of users: rows are validated individually, checked for
+    duplicates with one query, hashed in parallel and inserted in one
+    transaction. Rows that fail are reported, the rest are created.
+
+    """
+    errors, valid = [], []
+    seen_usernames, seen_emails = set(), set()
+    for row_index, row in enumerate(rows):
+        try:
+            user = schemas.User.model_validate(row)
+        except ValidationError as e:
+            username = row.get("username") if isinstance(row.get("username"), str) else None
+            errors.append(schemas.BulkUserError(row=row_index, username=username, detail=validation_detail(e)))
+            continue
+        if user.base_role not in BASE_ROLES:
+            errors.append(schemas.BulkUserError(
+                row=row_index, username=user.username,
+                detail=f"Invalid base_role '{user.base_role}', expected one of: {', '.join(sorted(BASE_ROLES))}",
+            ))
+        elif user.username in seen_usernames:
+            errors.append(schemas.BulkUserError(row=row_index, username=user.username, detail="Duplicate username in batch"))
+        elif user.email in seen_emails:
+            errors.append(schemas.BulkUserError(row=row_index, username=user.username, detail="Duplicate email in batch"))
+        else:
+            seen_usernames.add(user.username)
+            seen_emails.add(user.email)
+            valid.append((row_index, user))
+
+    if valid:
+        result = await db.execute(
+            select(users.User.username, users.User.email)
+            .where(or_(users.User.username.in_(seen_usernames), users.User.email.in_(seen_emails)))
+        )
+        taken_usernames, taken_emails = set(), set()
+        for username, email in result.all():
+            taken_usernames.add(username)
+            taken_emails.add(email)
+        remaining = []
+        for row_index, user in valid:
+            if user.username in taken_usernames:
+                errors.append(schemas.BulkUserError(row=row_index, username=user.username, detail="Username already taken"))
+            elif user.email in taken_emails:
+                errors.append(schemas.BulkUserError(row=row_index, username=user.username, detail="Email already registered"))
+            else:
+                remaining.append(user)
+        valid = remaining
+
+    created = []
+    if valid:
+        # bcrypt runs on the bulk hashing pool, so logins are not queued behind the import
+        hashes = await security.hash_passwords_bulk_async([user.password for user in valid])
+        created = [
+            users.User(
+                username=user.username, email=user.email, password=password_hash,
+                base_role=user.base_role, auth_role="user", is_deleted=False
+            )
+            for user, password_hash in zip(valid, hashes)
+        ]
+        db.add_all(created)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another request took one of the names since the uniqueness check
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Users were created concurrently, retry the import")
+
+    errors.sort(key=lambda error: error.row)
+    return schemas.BulkUserImportResponse(
+        created=[schemas.UserResponse.model_validate(user) for user in created], errors=errors
+    )
+
+async def list_users(db: AsyncSession, after: str | None = None, limit: int = 50, include_deleted: bool = False, email: str | None = None):
+    """
+    One page of users ordered by username, starting after the cursor username.
+    Seeks on the username index instead of counting past an offset.
+
+    """
+    query = select(users.User).order_by(users.User.username).limit(limit + 1)
+    if after:
+        query = query.where(users.User.username > after)
+    if email:
+        query = query.where(users.User.email == email)
+    if not include_deleted:
+        query = query.where(users.User.is_deleted == False)  # noqa: E712
+    result = await db.execute(query)
+    rows = result.scalars().all()
+    page = rows[:limit]
+    return schemas.UserPage(
+        users=[schemas.UserListItem.model_validate(user) for user in page],
+        next_cursor=page[-1].username if len(rows) > limit else None,
+    )
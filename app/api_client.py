@@ -0,0 +1,106 @@
+import base64
+import json
+import logging
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger("api_client")
+
+# (connect, read) timeouts in seconds; for streams the read timeout is per chunk
+DEFAULT_TIMEOUT = (3.05, 30)
+STREAM_TIMEOUT = (3.05, 120)
+
+
+def token_expiry(token):
+    """The exp claim of a JWT (not verified: the backend does that), or None."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+
+class ApiClient:
+    """
+    Backend client for one Streamlit session: a keep-alive connection pool,
+    the bearer token, and the current user cached until the token expires.
+
+    """
+
+    def __init__(self, base_url, pool_size=4):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        # Only idempotent GETs are retried, and only on connection errors
+        retry = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2, allowed_methods={"GET"})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.token = None
+        self._user = None
+        self._user_expires_at = 0.0
+
+    def request(self, method, path, timeout=DEFAULT_TIMEOUT, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", headers=headers, timeout=timeout, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            # For streamed responses this is the time to the response headers
+            logger.info("%s %s -> %s in %.1f ms", method, path, status, (time.perf_counter() - start) * 1000)
+
+    # auth
+
+    def set_token(self, token):
+        if token != self.token:
+            self.token = token
+            self._user = None
+
+    def login(self, username, password):
+        response = self.request("POST", "/login_token", data={"username": username, "password": password})
+        if response.status_code == 200:
+            self.set_token(response.json().get("access_token"))
+        return response
+
+    def logout(self):
+        self.set_token(None)
+
+    def register(self, user_data):
+        return self.request("POST", "/user_create", json=user_data)
+
+    def current_user(self):
+        """
+        Returns (user, response): the cached user while the token is valid,
+        otherwise /users/me (response is None on a cache hit).
+
+        """
+        if self._user is not None and time.time() < self._user_expires_at:
+            return self._user, None
+        response = self.request("GET", "/users/me")
+        if response.status_code != 200:
+            self._user = None
+            return None, response
+        self._user = response.json()
+        # Without an exp claim, re-check after a minute
+        self._user_expires_at = token_expiry(self.token) or time.time() + 60
+        return self._user, response
+
+    # documents
+
+    def _multipart(self, uploaded_file, fields):
+        # Streams the file from its buffer in chunks instead of copying it with getvalue()
+        uploaded_file.seek(0)
+        encoder = MultipartEncoder(fields=dict(fields, file=(uploaded_file.name, uploaded_file, uploaded_file.type)))
+        return encoder, {"Content-Type": encoder.content_type}
+
+    def upload_stream(self, uploaded_file, question):
+        encoder, headers = self._multipart(uploaded_file, {"question": question})
+        return self.request("POST", "/upload/stream", data=encoder, headers=headers, timeout=STREAM_TIMEOUT, stream=True)
@@ -1,5 +1,10 @@
 import streamlit as st
 import requests
+import json
+import logging
+from api_client import ApiClient
+
+logging.basicConfig(level=logging.INFO)
 
 # FastAPI Backend URL
 API_URL = "http://127.0.0.1:8000"  # Update if deployed
@@ -14,6 +19,14 @@ if "access_token" not in st.session_state:
     st.session_state.access_token = None
 if "authenticated" not in st.session_state:
     st.session_state.authenticated = False
+if "api_client" not in st.session_state:
+    # One pooled keep-alive client per browser session, kept across reruns
+    st.session_state.api_client = ApiClient(API_URL)
+
+def get_client():
+    client = st.session_state.api_client
+    client.set_token(st.session_state.access_token)
+    return client
 
 # Function to Register
 def register_user(username, email, password, role):
@@ -24,7 +37,7 @@ def register_user(username, email, password, role):
         "base_role": role
     }
     try:
-        response = requests.post(f"{API_URL}/user_create", json=user_data)
+        response = get_client().register(user_data)
         if response.status_code == 200:
             st.success("Registration successful! Please log in.")
             st.session_state.auth_mode = "login"
@@ -37,13 +50,10 @@ def register_user(username, email, password, role):
 # Function to Login User
 def login_user(username, password):
     try:
-        response = requests.post(
-            f"{API_URL}/login_token",
-            data={"username": username, "password": password}
-        )
+        client = get_client()
+        response = client.login(username, password)
         if response.status_code == 200:
-            data = response.json()
-            st.session_state.access_token = data.get("access_token")
+            st.session_state.access_token = client.token
             st.session_state.authenticated = True
             st.success("Login Successful!")
             st.rerun()
@@ -58,11 +68,11 @@ def get_current_user():
         st.error("No access token found. Please log in.")
         return None
     
-    headers = {"Authorization": f"Bearer {st.session_state.access_token}"}
     try:
-        response = requests.get(f"{API_URL}/users/me", headers=headers)
-        if response.status_code == 200:
-            return response.json()
+        # Cached until the token expires, so reruns do not hit /users/me
+        user_info, response = get_client().current_user()
+        if user_info:
+            return user_info
         else:
             st.error(f"Failed to fetch user info: {response.status_code} - {response.text}")
             st.session_state.access_token = None
@@ -75,31 +85,59 @@ def get_current_user():
 
 # Function to Logout User
 def logout_user():
+    get_client().logout()
     st.session_state.access_token = None
     st.session_state.authenticated = False
     st.success("Logged out successfully!")
     st.rerun()
 
-# Function to Upload File
-def upload_file(uploaded_file, question, access_token):
+# Function to read server-sent events from a streaming response
+def iter_sse(response):
+    event, data = "message", []
+    response.encoding = response.encoding or "utf-8"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+# Function to Upload File and render the answer as it is generated
+def upload_file_stream(uploaded_file, question, access_token):
     if not access_token:
         st.error("No access token found. Please log in again.")
         return None
 
-    headers = {"Authorization": f"Bearer {access_token}"}
-    files = {"file": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)}
-    data = {"question": question}
-
     try:
-        response = requests.post(f"{API_URL}/upload/", files=files, data=data, headers=headers)
-        if response.status_code == 200:
-            result = response.json()
-            st.success("File uploaded successfully!")
-            return result
-        else:
-            error_msg = response.json().get('detail', 'Unknown error')
-            st.error(f"Upload failed: {error_msg}")
-            return None
+        with get_client().upload_stream(uploaded_file, question) as response:
+            if response.status_code != 200:
+                st.error(f"Upload failed: {response.json().get('detail', 'Unknown error')}")
+                return None
+
+            progress_bar = st.progress(0.0, text="Queued")
+            answer_box = st.empty()
+            answer, sources = "", []
+            for event, payload in iter_sse(response):
+                if event == "stage":
+                    progress_bar.progress(payload["progress"], text=payload["stage"].capitalize())
+                elif event == "token":
+                    answer += payload
+                    answer_box.markdown(f"**AI-Generated Answer:** {answer}")
+                elif event == "sources":
+                    sources = payload
+                elif event == "error":
+                    st.error(f"Processing failed: {payload.get('detail', 'Unknown error')}")
+                    return None
+            progress_bar.progress(1.0, text="Completed")
+
+            if sources:
+                with st.expander("Sources"):
+                    for source in sources:
+                        st.markdown(f"> {source['content']}")
+            return {"generated_answer": answer, "sources": sources}
     except requests.exceptions.RequestException as e:
         st.error(f"Error connecting to backend: {str(e)}")
         return None
@@ -135,16 +173,14 @@ def main_app():
 
             uploaded_file = st.file_uploader(
                 "Choose a document (PDF, Image, Audio)", 
-                type=["pdf", "png", "jpg", "jpeg", "mp3", "wav"]
+                type=["pdf", "png", "jpg", "jpeg", "tif", "tiff", "mp3", "wav"]
             )
 
             if uploaded_file:
                 question = st.text_input("Ask a question related to the document:")
                 
                 if st.button("Upload & Process", use_container_width=True):
-                    result = upload_file(uploaded_file, question, st.session_state.access_token)
-                    if result:
-                        st.write(f"**AI-Generated Answer:** {result.get('generated_answer', 'No answer provided.')}")
+                    upload_file_stream(uploaded_file, question, st.session_state.access_token)
         else:
             # If user_info is None, redirect to login
             st.session_state.auth_mode = "login"
@@ -0,0 +1,223 @@
+"""
+Bulk ingestion of a document directory for one user, without the HTTP upload path
+or its LLM call:
+
+    python -m app.bulk_ingest data/uploaded_documents --username alice_smith
+    python -m app.bulk_ingest /mnt/onboarding --username acme_legal --workers 8 --batch-size 256
+
+Files are extracted (PDF text, OCR, transcription) in a process pool while the
+main process chunks and embeds finished files in write batches of --batch-size
+chunks. Every finished file is appended to a JSONL manifest, so an interrupted
+run started again skips files already done (unless they changed since). Files
+the user has already ingested, found by content hash, are not extracted again.
+
+With the default Chroma vector store the API must be stopped first: only one
+process may open the store, and the run exits if another one holds it. With
+VECTOR_BACKEND=mmap it can run alongside the API.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from app.core.config import SETTINGS
+from app.core.database import SessionLocal
+from app.models import users
+from app.services import document_store
+from app.services.model_registry import registry
+from app.services.extraction import AUDIO_EXTENSIONS, IMAGE_EXTENSIONS, extract_sections
+from app.api.utility.api_file_identification import ingest_document
+
+EXTENSIONS = set(IMAGE_EXTENSIONS) | set(AUDIO_EXTENSIONS) | {".pdf"}
+DEFAULT_MANIFEST_DIR = Path("data/bulk_ingest")
+
+
+def find_files(directory):
+    """Supported files under directory, in a stable order."""
+    return sorted(
+        path for path in Path(directory).rglob("*")
+        if path.is_file() and path.suffix.lower() in EXTENSIONS
+    )
+
+
+def file_key(path):
+    stat = path.stat()
+    return {"path": str(path.resolve()), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def load_manifest(manifest_path):
+    """The latest manifest entry of every file by path."""
+    entries = {}
+    if not manifest_path.exists():
+        return entries
+    with open(manifest_path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interrupted write
+            entries[entry["path"]] = entry
+    return entries
+
+
+def should_skip(key, entries, retry_failed=False):
+    """Files already ingested, or failed when not retrying, and unchanged since."""
+    entry = entries.get(key["path"])
+    if entry is None or entry["size"] != key["size"] or entry["mtime"] != key["mtime"]:
+        return False
+    return entry["status"] != "failed" or not retry_failed
+
+
+def extract_file(path, file_extension):
+    """Runs in a pool worker: every (section, text) pair of a file and the extraction time."""
+    start = time.perf_counter()
+    sections = list(extract_sections(path, file_extension))
+    return sections, time.perf_counter() - start
+
+
+def find_user(username):
+    db = SessionLocal()
+    try:
+        user = db.query(users.User).filter(users.User.username == username).first()
+        if user is None:
+            raise SystemExit(f"User not found: {username}")
+        return user.id, user.base_role
+    finally:
+        db.close()
+
+
+def already_ingested(path, owner_id):
+    db = SessionLocal()
+    try:
+        document = document_store.find_by_hash(db, owner_id, document_store.file_sha256(path))
+        return document if document is not None and document.chunk_ids else None
+    finally:
+        db.close()
+
+
+class Progress:
+    """Running totals, printed after every file."""
+
+    def __init__(self, total):
+        self.total = total
+        self.started_at = time.perf_counter()
+        self.files = self.failed = self.chunks = self.bytes = 0
+
+    def report(self, entry):
+        self.files += 1
+        self.failed += entry["status"] == "failed"
+        self.chunks += entry.get("chunks", 0)
+        self.bytes += entry["size"]
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        rate = self.files / elapsed
+        eta = (self.total - self.files) / rate if rate else 0
+        print(
+            f"[{self.files}/{self.total}] {entry['status']:<8} {Path(entry['path']).name} "
+            f"| {rate:.2f} files/s, {self.bytes / elapsed / 1e6:.2f} MB/s, {self.chunks / elapsed:.1f} chunks/s, "
+            f"ETA {eta:.0f}s",
+            flush=True,
+        )
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "files": self.files,
+            "failed": self.failed,
+            "chunks": self.chunks,
+            "megabytes": round(self.bytes / 1e6, 2),
+            "seconds": round(elapsed, 2),
+            "files_per_second": round(self.files / elapsed, 3) if elapsed else None,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--username", required=True, help="Owner of the ingested documents")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="Extraction processes")
+    parser.add_argument("--batch-size", type=int, default=SETTINGS.embedding_write_batch_size, help="Chunks per embedding write")
+    parser.add_argument("--manifest", help="Resume manifest (default data/bulk_ingest/<username>.jsonl)")
+    parser.add_argument("--ttl-seconds", type=int, help="Document TTL (default: the user's retention policy)")
+    parser.add_argument("--retry-failed", action="store_true", help="Also retry files that failed in an earlier run")
+    args = parser.parse_args(argv)
+
+    SETTINGS.embedding_write_batch_size = args.batch_size
+    if SETTINGS.vector_backend != "mmap":
+        # Claim the Chroma store before any work, so a running API stops the run here
+        try:
+            registry.get("chroma_client")
+        except RuntimeError as e:
+            raise SystemExit(f"{str(e)}. Stop the API first, or use VECTOR_BACKEND=mmap.")
+    owner_id, base_role = find_user(args.username)
+    manifest_path = Path(args.manifest) if args.manifest else DEFAULT_MANIFEST_DIR / f"{args.username}.jsonl"
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+
+    entries = load_manifest(manifest_path)
+    all_files = [(path, file_key(path)) for path in find_files(args.directory)]
+    files = [(path, key) for path, key in all_files if not should_skip(key, entries, args.retry_failed)]
+    print(
+        f"{len(files)} files to ingest for {args.username} ({len(all_files) - len(files)} skipped), {args.workers} workers",
+        flush=True,
+    )
+
+    progress = Progress(len(files))
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+    with open(manifest_path, "a") as manifest:
+        def record(entry):
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            progress.report(entry)
+
+        pending = {}
+        queued = iter(files)
+        try:
+            while True:
+                # Keep a bounded window of extractions in flight, so finished text
+                # does not pile up in memory faster than it can be embedded
+                while len(pending) < args.workers * 2:
+                    item = next(queued, None)
+                    if item is None:
+                        break
+                    path, key = item
+                    document = already_ingested(path, owner_id)
+                    if document is not None:
+                        record(dict(key, status="reused", document_id=document.id, chunks=len(document.chunk_ids)))
+                        continue
+                    pending[pool.submit(extract_file, str(path), path.suffix.lower())] = (path, key)
+                if not pending:
+                    break
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path, key = pending.pop(future)
+                    start = time.perf_counter()
+                    try:
+                        sections, extract_seconds = future.result()
+                        document = ingest_document(
+                            str(path), path.suffix, owner_id, base_role, path.name,
+                            ttl_seconds=args.ttl_seconds, sections=sections,
+                        )
+                    except Exception as e:
+                        record(dict(key, status="failed", error=f"{type(e).__name__}: {str(e)}"))
+                        continue
+                    record(dict(
+                        key, status="ingested", document_id=document.id, chunks=len(document.chunk_ids),
+                        extract_seconds=round(extract_seconds, 3), embed_seconds=round(time.perf_counter() - start, 3),
+                    ))
+        except KeyboardInterrupt:
+            print("Interrupted; finished files are in the manifest and are skipped on the next run", flush=True)
+            pool.shutdown(wait=False, cancel_futures=True)
+            return 130
+    pool.shutdown()
+
+    summary = progress.summary()
+    print(json.dumps(summary), flush=True)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
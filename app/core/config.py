@@ -4,10 +4,125 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class Settings(BaseSettings):
-    database_url: str 
-    secret_key: str 
-    algorithm: str 
+    database_url: str
+    secret_key: str
+    algorithm: str
     access_token_expire_minutes: int
     session_cookie_name:str
 
+    # resolved-user cache for authenticated requests
+    auth_cache_size: int = 4096
+    auth_cache_ttl: int = 30
+
+    # background ingestion jobs
+    ingestion_workers: int = 2
+    ingestion_queue_size: int = 32
+    job_ttl_seconds: int = 3600
+    job_store: str = "data/jobs.sqlite3"  # job status shared by all workers on the host
+
+    # production server (gunicorn with uvicorn workers, see gunicorn.conf.py); workers 0 uses
+    # every core. More than one worker requires VECTOR_BACKEND=mmap: Chroma's persistent
+    # client does not support several processes on one directory, so the first process to
+    # open VECTOR_STORE_DIR locks it (data/vector_store/.chroma.lock). Jobs run in the worker
+    # that accepted them, so recycling (max requests > 0) fails jobs still running after
+    # the graceful timeout.
+    server_bind: str = "0.0.0.0:8000"
+    server_workers: int = 1
+    server_timeout: int = 300
+    server_graceful_timeout: int = 60
+    server_max_requests: int = 0
+    server_max_requests_jitter: int = 0
+
+    # models and vector store
+    embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    whisper_model: str = "base"
+    llm_model: str = "llama-3.3-70b-versatile"
+    vector_store_dir: str = "data/vector_store"
+    warmup_models: str = ""
+    vector_partition: str = "owner"  # "owner" (one collection per user) or "role"
+    vector_backend: str = "chroma"  # "chroma" or "mmap" (memory-mapped quantized vectors)
+
+    # mmap vector backend (IVF lists 0: exact search)
+    mmap_dtype: str = "float16"  # "float16" or "int8"
+    mmap_ivf_lists: int = 0
+    mmap_ivf_probes: int = 8
+    mmap_ivf_min_rows: int = 20000
+
+    # streaming ingestion
+    embedding_write_batch_size: int = 64
+    pdf_workers: int = 2
+    pdf_pages_per_task: int = 8
+    pdf_min_text_chars: int = 20
+
+    # audio transcription
+    transcription_workers: int = 1
+    transcription_segment_seconds: int = 120
+
+    # OCR pipeline ("pipeline": normalize/tile/batch, "simple": one readtext call per image)
+    ocr_engine_mode: str = "pipeline"
+    ocr_max_side: int = 2560
+    ocr_tile_size: int = 1600
+    ocr_tile_overlap: int = 64
+    ocr_tile_batch_size: int = 4
+    ocr_recognition_batch_size: int = 16
+    ocr_workers: int = 0
+    ocr_min_confidence: float = 0.0
+
+    # upload admission control, shared by all workers on the host through ADMISSION_STORE.
+    # Uploads cost a base plus a per-MB amount by extraction stage; STAGE_CONCURRENCY caps
+    # how many jobs run OCR, transcription or embedding at once.
+    admission_store: str = "data/admission.sqlite3"
+    admission_max_cost: float = 200.0
+    admission_base_cost: dict[str, float] = {"ocr": 4.0, "transcription": 2.0, "pdf_extraction": 1.0}
+    admission_cost_per_mb: dict[str, float] = {"ocr": 2.0, "transcription": 6.0, "pdf_extraction": 1.0}
+    admission_max_retry_after: int = 300
+    admission_poll_seconds: float = 0.2
+    stage_concurrency: dict[str, int] = {"ocr": 2, "transcription": 1, "embedding": 2}
+
+    # embedding backend ("torch", "onnx", "onnx-int8"); threads 0 uses the runtime default
+    embedding_backend: str = "torch"
+    embedding_threads: int = 0
+    embedding_onnx_dir: str = "data/models/onnx"
+    embedding_onnx_batch_size: int = 32
+
+    # embedding micro-batching
+    embedding_batching: bool = True
+    embedding_batch_max_size: int = 64
+    embedding_batch_max_wait_ms: int = 10
+
+    # local inference worker (python -m app.services.inference_worker) owning the OCR,
+    # whisper and embedding models; an empty socket runs the models in-process
+    inference_worker_socket: str = ""
+    inference_worker_authkey: str | None = None  # required with a socket: shared secret of the API and worker
+    inference_worker_timeout: int = 300
+    inference_worker_fallback: bool = False  # run in-process when the worker is unreachable
+    inference_worker_concurrency: dict[str, int] = {"embedding": 8, "ocr": 1, "whisper": 1}
+
+    # query embedding and answer caches
+    query_embedding_cache_size: int = 2048
+    query_embedding_cache_ttl: int = 3600
+    answer_cache_size: int = 1024
+    answer_cache_ttl: int = 900
+
+    # retrieval ("vector", "hybrid": BM25 + vector score fusion, "lexical": BM25 only)
+    retrieval_mode: str = "vector"
+    hybrid_vector_weight: float = 0.5
+    hybrid_candidates: int = 20
+    lexical_fast_path: bool = True
+
+    # prompt context packing (token budgets per role, e.g. ROLE_CONTEXT_BUDGETS='{"lawyer": 2500}').
+    # CONTEXT_TOKENIZER is the Hugging Face tokenizer of LLM_MODEL, loaded from the local
+    # cache only; without it tokens are estimated as 4 characters each.
+    context_candidates: int = 12
+    context_token_budget: int = 1500
+    role_context_budgets: dict[str, int] = {}
+    context_mmr_lambda: float = 0.7
+    context_tokenizer: str = "meta-llama/Llama-3.3-70B-Instruct"
+
+    # document lifecycle (TTL 0 keeps documents until deleted)
+    document_ttl_seconds: int = 0
+    lifecycle_interval_seconds: int = 300
+    compaction_threshold: float = 0.25
+    compaction_min_deleted: int = 500
+
 SETTINGS = Settings()
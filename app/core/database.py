@@ -1,6 +1,7 @@
 import os
 from sqlalchemy import create_engine,text
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -11,11 +12,41 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL not set in environment variables")
 
-# Create database engine
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Async driver URL, derived from DATABASE_URL unless given explicitly
+ASYNC_DRIVERS = {
+    "postgresql://": "postgresql+asyncpg://",
+    "postgresql+psycopg2://": "postgresql+asyncpg://",
+    "sqlite://": "sqlite+aiosqlite://",
+}
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+if not ASYNC_DATABASE_URL:
+    ASYNC_DATABASE_URL = DATABASE_URL
+    for prefix, async_prefix in ASYNC_DRIVERS.items():
+        if DATABASE_URL.startswith(prefix):
+            ASYNC_DATABASE_URL = async_prefix + DATABASE_URL[len(prefix):]
+            break
 
-# Session factory for database interactions
+# Connection pool sizing (ignored for SQLite, which uses its own pool classes)
+POOL_OPTIONS = {} if DATABASE_URL.startswith("sqlite") else {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+}
+
+# Create database engines; the async engine is created on first use, so scripts that
+# only use the sync engine (bulk ingestion, the inference worker) need no async driver
+engine = create_engine(DATABASE_URL, pool_pre_ping=True, **POOL_OPTIONS)
+async_engine = None
+
+def get_async_engine():
+    global async_engine
+    if async_engine is None:
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True, **POOL_OPTIONS)
+    return async_engine
+
+# Session factories for database interactions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Base class for ORM models
 Base = declarative_base()
@@ -29,3 +60,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """
+    Provide an async database session for dependency injection.
+    """
+    async with AsyncSessionLocal(bind=get_async_engine()) as db:
+        yield db
+
+def pool_stats():
+    """Connection pool usage of the sync and async engines."""
+    stats = {}
+    pools = [("sync", engine.pool)]
+    if async_engine is not None:
+        pools.append(("async", async_engine.sync_engine.pool))
+    for name, pool in pools:
+        stats[name] = {
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+        }
+    return stats
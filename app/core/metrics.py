@@ -0,0 +1,66 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds",
+    "Time spent in each pipeline stage (ocr, transcription, pdf_extraction, chunking, embedding, lexical_search, vector_search, llm)",
+    ["stage", "file_type", "role"],
+    buckets=STAGE_BUCKETS,
+)
+CHUNKS_WRITTEN = Counter("chunks_written_total", "Chunks written to the vector store", ["file_type", "role"])
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes received in uploads", ["file_type", "role"])
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups", ["cache", "result"])
+PROMPT_TOKENS = Histogram(
+    "prompt_context_tokens",
+    "Tokens of retrieved context packed into each prompt",
+    ["role"],
+    buckets=(64, 128, 256, 512, 1024, 1536, 2048, 3072, 4096, 8192),
+)
+ADMISSION_REJECTIONS = Counter("admission_rejections_total", "Uploads shed by admission control", ["path"])
+RATE_LIMIT_REJECTIONS = Counter("rate_limit_rejections_total", "Requests rejected by the rate limiter", ["path"])
+
+
+@contextmanager
+def observe_stage(stage, file_type="", role=""):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage, file_type, role).observe(time.perf_counter() - start)
+
+
+def timed_iter(iterable, stage, file_type="", role=""):
+    """
+    Passes items through while timing only the producer, so a lazily streamed
+    stage (e.g. PDF pages feeding the embedder) is not charged for its consumer.
+
+    """
+    elapsed = 0.0
+    iterator = iter(iterable)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        STAGE_SECONDS.labels(stage, file_type, role).observe(elapsed)
+
+
+def render():
+    """Prometheus text exposition, aggregated across workers in multiprocess mode."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,39 @@
+import fcntl
+import os
+
+# Lock files held for the life of the process, by path
+_held = {}
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def hold_exclusive(path):
+    """
+    Takes an exclusive lock on path for the rest of this process's life, recording
+    the pid in the file. Raises RuntimeError naming the holder if another process
+    already has it.
+
+    """
+    if path in _held:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    lock_file = open(path, "a+")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.seek(0)
+        holder = lock_file.read().strip() or "unknown"
+        lock_file.close()
+        raise RuntimeError(f"{path} is held by process {holder}")
+    lock_file.truncate(0)
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    _held[path] = lock_file
@@ -1,7 +1,22 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is CPU-bound; async callers run it here instead of on the event loop
+hash_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "4")),
+    thread_name_prefix="password-hash",
+)
+
+# Bulk imports hash on their own, smaller pool so they never queue ahead of logins
+bulk_hash_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PASSWORD_BULK_HASH_WORKERS", "2")),
+    thread_name_prefix="password-hash-bulk",
+)
+
 #hashing plain password
 def hash_password(plain_password: str) -> str:
     return pwd_context.hash(plain_password)
@@ -11,4 +26,18 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
         return pwd_context.verify(plain_password, hashed_password)
     except ValueError:
-        return False
\ No newline at end of file
+        return False
+
+async def hash_password_async(plain_password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_executor, hash_password, plain_password)
+
+async def hash_passwords_bulk_async(plain_passwords: list[str]) -> list[str]:
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(
+        *(loop.run_in_executor(bulk_hash_executor, hash_password, password) for password in plain_passwords)
+    )
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_executor, verify_password, plain_password, hashed_password)
@@ -0,0 +1,54 @@
+import os
+import sys
+import logging
+from app.core.config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count():
+    workers = SETTINGS.server_workers or os.cpu_count() or 1
+    if workers > 1 and SETTINGS.vector_backend != "mmap":
+        raise RuntimeError(
+            f"SERVER_WORKERS={workers} requires VECTOR_BACKEND=mmap; "
+            "Chroma's persistent client cannot be shared by several processes"
+        )
+    return workers
+
+
+def threads_per_worker():
+    """Intra-op threads per worker, so N workers do not oversubscribe the cores."""
+    return SETTINGS.embedding_threads or max(1, (os.cpu_count() or 1) // worker_count())
+
+
+def preload():
+    """
+    Runs in the master before workers are forked: loads the fork-safe models
+    (WARMUP_MODELS, or every registered model) so their weights are shared.
+
+    """
+    from app.services.model_registry import registry, warmup_names
+    if "torch" in sys.modules or SETTINGS.embedding_backend == "torch":
+        import torch
+        torch.set_num_threads(threads_per_worker())
+    registry.preload(warmup_names() or None)
+    logger.info(f"Preloaded models: {[name for name, s in registry.status().items() if s['loaded']]}")
+
+
+def after_fork():
+    """
+    Resets per-process state a worker must not share with the master: pooled
+    database connections and worker process pools.
+
+    """
+    from app.core import database
+    database.engine.dispose(close=False)
+    if database.async_engine is not None:
+        database.async_engine.sync_engine.dispose(close=False)
+
+    from app.services import ocr_service, summarization, transcription
+    for module in (ocr_service, summarization, transcription):
+        module._pool = None
+
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads_per_worker())
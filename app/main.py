@@ -1,10 +1,17 @@
 from fastapi import FastAPI
 from app.core.database import engine
 from app.models.users import Base
+from app.models import documents
 from .api import routes  
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from slowapi.errors import RateLimitExceeded
+from app.services.model_registry import registry, warmup_names
+from app.services import lifecycle
 
 app = FastAPI()
+app.state.limiter = routes.limiter
+app.add_exception_handler(RateLimitExceeded, routes.ratelimit)
 
 # CORS configuration
 origins = [
@@ -27,4 +34,29 @@ app.add_middleware(
 
 Base.metadata.create_all(bind=engine)
 
-app.include_router(routes.router)
\ No newline at end of file
+app.include_router(routes.router)
+
+@app.middleware("http")
+async def shed_uploads(request, call_next):
+    # Reject uploads the admission budget cannot take before reading their bodies
+    if request.method == "POST" and request.url.path in routes.UPLOAD_PATHS:
+        response = await routes.precheck_upload(request)
+        if response is not None:
+            return response
+    return await call_next(request)
+
+@app.on_event("startup")
+async def warmup_models():
+    # Optional: WARMUP_MODELS=ocr,whisper,embedding (or "all") loads models before serving
+    names = warmup_names()
+    if names:
+        await run_in_threadpool(registry.warmup, names)
+
+@app.on_event("startup")
+async def start_maintenance():
+    # Background document expiry and vector store compaction
+    lifecycle.start_maintenance()
+
+@app.on_event("shutdown")
+async def stop_maintenance():
+    lifecycle.stop_maintenance()
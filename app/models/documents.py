@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, UniqueConstraint, func
+from app.models.users import Base
+
+class Document(Base):
+    __tablename__ = "documents"
+    __table_args__ = (UniqueConstraint("owner_id", "content_hash", name="uq_documents_owner_hash"),)
+
+    id = Column(String, primary_key=True, index=True)
+    owner_id = Column(Integer, index=True, nullable=False)
+    base_role = Column(String, nullable=False)
+    content_hash = Column(String(64), index=True, nullable=False)
+    filename = Column(String, nullable=True)
+    file_type = Column(String, nullable=False)
+    text = Column(Text, nullable=True)
+    chunk_ids = Column(JSON, default=list, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), index=True, nullable=True)
+
+class TenantRetention(Base):
+    """Per-tenant default document TTL, overriding DOCUMENT_TTL_SECONDS."""
+    __tablename__ = "tenant_retention"
+
+    owner_id = Column(Integer, primary_key=True)
+    document_ttl_seconds = Column(Integer, nullable=True)
+
+class CollectionStats(Base):
+    """Vectors deleted from a collection since it was last compacted."""
+    __tablename__ = "collection_stats"
+
+    name = Column(String, primary_key=True)
+    deleted_vectors = Column(Integer, default=0, nullable=False)
+    compacted_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,4 +1,5 @@
 from pydantic import BaseModel,EmailStr,Field,field_validator
+from datetime import datetime
 from enum import Enum
 import re 
 
@@ -20,10 +21,13 @@ class AuthRole(str,Enum):
 class User(BaseModel):
     """Schema for creating a new user."""
     
+    id: int | None = None
     username: str = Field(...,min_length=5,max_length= 50)
     email: EmailStr = Field(...,max_length=50)
     password: str = Field(...,min_length=10,max_length=60)
     base_role: str = Field(...)
+    # set on the authenticated principal from the database; ignored when creating users
+    auth_role: str | None = None
     
     #for password complexiety
     @field_validator('password')
@@ -64,6 +68,37 @@ class UserResponse(BaseModel):
     class Config():
         from_attributes = True
 
+class UserListItem(UserResponse):
+    """Schema for a user in the admin listing."""
+    id: int
+    auth_role: str
+    is_deleted: bool | None = None
+
+
+class UserPage(BaseModel):
+    """Schema for one keyset page of users; next_cursor is the username to continue after."""
+    users: list[UserListItem]
+    next_cursor: str | None = None
+
+
+class BulkUserImport(BaseModel):
+    """Schema for importing a batch of users. Rows are validated one by one, so
+    invalid rows are reported instead of rejecting the batch."""
+    users: list[dict] = Field(..., min_length=1, max_length=1000)
+
+
+class BulkUserError(BaseModel):
+    """Schema for a row that was not imported (row is its index in the batch)."""
+    row: int
+    username: str | None = None
+    detail: str
+
+
+class BulkUserImportResponse(BaseModel):
+    """Schema for the result of a bulk user import."""
+    created: list[UserResponse]
+    errors: list[BulkUserError]
+
 class Login(BaseModel):
     """Schema for user login credentials."""
     
@@ -84,5 +119,47 @@ class TokenPayload(BaseModel):
     
     username:str | None = None
     role: BaseRole | None = None
-    
 
+
+class JobStatus(BaseModel):
+    """Schema for background job status."""
+
+    job_id: str
+    stage: str
+    progress: float
+    result: dict | None = None
+    error: str | None = None
+    created_at: float
+    updated_at: float
+
+
+class DocumentResponse(BaseModel):
+    """Schema for returning an ingested document."""
+
+    id: str
+    filename: str | None = None
+    file_type: str
+    base_role: str
+    chunk_count: int
+    created_at: datetime | None = None
+    expires_at: datetime | None = None
+
+
+class RetentionPolicy(BaseModel):
+    """Schema for a user's default document TTL (None: server default, 0: keep forever)."""
+
+    document_ttl_seconds: int | None = Field(None, ge=0)
+
+
+class AskRequest(BaseModel):
+    """Schema for asking a question over already-ingested documents."""
+
+    question: str = Field(..., min_length=1)
+    stream: bool = False
+
+
+class AskResponse(BaseModel):
+    """Schema for a generated answer and its source chunks."""
+
+    generated_answer: str
+    sources: list[dict]
@@ -0,0 +1,211 @@
+import functools
+import math
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing, contextmanager
+from app.core.config import SETTINGS
+from app.core.processes import pid_alive
+from app.services.extraction import extraction_stage
+
+# Resource name of the whole-request admission budget (stages use their own names)
+UPLOADS = "uploads"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    id TEXT PRIMARY KEY,
+    resource TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_resource ON leases(resource);
+CREATE TABLE IF NOT EXISTS throughput (
+    resource TEXT PRIMARY KEY,
+    seconds_per_cost REAL NOT NULL
+);
+"""
+
+
+class OverloadedError(Exception):
+    """Raised when admitting a request would exceed the shared cost budget."""
+
+    def __init__(self, retry_after):
+        super().__init__("Server is busy, try again later")
+        self.retry_after = retry_after
+
+
+class SharedLimiter:
+    """
+    Weighted semaphores shared by every worker process on the host, kept as
+    leases in a SQLite file. Leases of processes that died are reaped, so a
+    crashed worker does not hold capacity forever.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    @staticmethod
+    def _reap(conn):
+        for (pid,) in conn.execute("SELECT DISTINCT pid FROM leases").fetchall():
+            if pid != os.getpid() and not pid_alive(pid):
+                conn.execute("DELETE FROM leases WHERE pid = ?", (pid,))
+
+    def try_acquire(self, resource, cost, capacity):
+        """
+        Takes a lease of the given cost if it fits in capacity, returning (lease id, used).
+        A request larger than the whole capacity is admitted when nothing else holds it.
+
+        """
+        with closing(self.connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reap(conn)
+                used = conn.execute("SELECT COALESCE(SUM(cost), 0) FROM leases WHERE resource = ?", (resource,)).fetchone()[0]
+                if used and used + cost > capacity:
+                    conn.execute("COMMIT")
+                    return None, used
+                lease = str(uuid.uuid4())
+                conn.execute(
+                    "INSERT INTO leases VALUES (?, ?, ?, ?, ?)", (lease, resource, os.getpid(), cost, time.time())
+                )
+                conn.execute("COMMIT")
+                return lease, used
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def release(self, lease):
+        """Drops a lease and folds its duration into the resource's seconds-per-cost average."""
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT resource, cost, created_at FROM leases WHERE id = ?", (lease,)).fetchone()
+            conn.execute("DELETE FROM leases WHERE id = ?", (lease,))
+            if row and row[1] > 0:
+                resource, cost, created_at = row
+                observed = (time.time() - created_at) / cost
+                conn.execute(
+                    "INSERT INTO throughput VALUES (?, ?) ON CONFLICT(resource) DO UPDATE "
+                    "SET seconds_per_cost = 0.8 * seconds_per_cost + 0.2 * excluded.seconds_per_cost",
+                    (resource, observed),
+                )
+
+    def used(self, resource):
+        with closing(self.connect()) as conn:
+            self._reap(conn)
+            return conn.execute("SELECT COALESCE(SUM(cost), 0) FROM leases WHERE resource = ?", (resource,)).fetchone()[0]
+
+    def seconds_per_cost(self, resource, default=1.0):
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT seconds_per_cost FROM throughput WHERE resource = ?", (resource,)).fetchone()
+        return row[0] if row else default
+
+    def usage(self):
+        with closing(self.connect()) as conn:
+            self._reap(conn)
+            return {
+                resource: {"leases": count, "cost": round(cost, 2)}
+                for resource, count, cost in conn.execute(
+                    "SELECT resource, COUNT(*), SUM(cost) FROM leases GROUP BY resource"
+                )
+            }
+
+
+limiter = SharedLimiter(SETTINGS.admission_store)
+
+
+def stage_cost(stage, size_bytes):
+    size_mb = size_bytes / (1024 * 1024)
+    return round(
+        SETTINGS.admission_base_cost.get(stage, 1.0) + size_mb * SETTINGS.admission_cost_per_mb.get(stage, 1.0), 3
+    )
+
+
+def upload_cost(file_extension, size_bytes):
+    """Work units of an upload: a per-stage base cost plus a per-megabyte cost."""
+    return stage_cost(extraction_stage(file_extension.lower()), size_bytes)
+
+
+def min_upload_cost(size_bytes):
+    """Cheapest cost a body of this size could have, whatever its file type."""
+    return min(stage_cost(stage, size_bytes) for stage in ("ocr", "transcription", "pdf_extraction"))
+
+
+def retry_after(used, cost):
+    # Roughly how long until enough in-flight work drains for this request to fit
+    excess = used + cost - SETTINGS.admission_max_cost
+    seconds = math.ceil(excess * limiter.seconds_per_cost(UPLOADS) / max(1, SETTINGS.ingestion_workers))
+    return min(max(seconds, 1), SETTINGS.admission_max_retry_after)
+
+
+def queue_retry_after(cost):
+    # The job queue is full: roughly how long until a queued job of this cost finishes
+    seconds = math.ceil(cost * limiter.seconds_per_cost(UPLOADS) / max(1, SETTINGS.ingestion_workers))
+    return min(max(seconds, 1), SETTINGS.admission_max_retry_after)
+
+
+def check(cost):
+    """Raises OverloadedError if cost would not fit the upload budget now, without reserving it."""
+    used = limiter.used(UPLOADS)
+    if used and used + cost > SETTINGS.admission_max_cost:
+        raise OverloadedError(retry_after(used, cost))
+
+
+def admit(cost):
+    """
+    Reserves cost units of the shared upload budget, covering the request from
+    the moment it is queued until its job finishes. Raises OverloadedError with
+    an estimated Retry-After when the budget is spent.
+
+    """
+    lease, used = limiter.try_acquire(UPLOADS, cost, SETTINGS.admission_max_cost)
+    if lease is None:
+        raise OverloadedError(retry_after(used, cost))
+    return lease
+
+
+def release_after(lease, func):
+    """Wraps a job body so the admission lease is released when it finishes."""
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            limiter.release(lease)
+    return run
+
+
+@contextmanager
+def stage_slot(stage):
+    """
+    Holds one of the stage's STAGE_CONCURRENCY slots across all workers,
+    waiting for a free one. Stages without a cap run unrestricted.
+
+    """
+    capacity = SETTINGS.stage_concurrency.get(stage)
+    if not capacity:
+        yield
+        return
+    while True:
+        lease, _ = limiter.try_acquire(stage, 1, capacity)
+        if lease is not None:
+            break
+        time.sleep(SETTINGS.admission_poll_seconds)
+    try:
+        yield
+    finally:
+        limiter.release(lease)
+
+
+def limited_iter(stage, iterable):
+    """Passes a lazily produced stage (e.g. OCR pages) through while holding its slot."""
+    with stage_slot(stage):
+        yield from iterable
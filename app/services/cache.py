@@ -0,0 +1,134 @@
+import re
+import threading
+from cachetools import TTLCache
+from langchain_core.embeddings import Embeddings
+from app.core.config import SETTINGS
+from app.core import metrics
+
+
+class StatsCache:
+    """Thread-safe bounded LRU/TTL cache with hit/miss counters."""
+
+    def __init__(self, name, maxsize, ttl):
+        self.name = name
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.CACHE_REQUESTS.labels(self.name, "miss" if value is None else "hit").inc()
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+    def pop(self, key):
+        with self._lock:
+            return self._cache.pop(key, None)
+
+    def invalidate(self, predicate):
+        """Removes every entry whose key matches predicate(key)."""
+        with self._lock:
+            for key in [key for key in self._cache.keys() if predicate(key)]:
+                self._cache.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._cache
+
+    def __len__(self):
+        return len(self._cache)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+        }
+
+
+class QueryEmbeddingCache(Embeddings):
+    """Embeddings wrapper that caches embed_query results."""
+
+    def __init__(self, base, cache):
+        self.base = base
+        self.cache = cache
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text):
+        key = " ".join(text.split())
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.base.embed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+    def stats(self):
+        stats = self.base.stats() if hasattr(self.base, "stats") else {}
+        stats["query_cache"] = self.cache.stats()
+        return stats
+
+
+class AnswerCache(StatsCache):
+    """
+    Caches generated answers by collection, owner, role, normalized query and
+    retrieved chunk ids, so tenants never share an answer (even one generated
+    without any context). Entries are dropped when any of their chunks is
+    rewritten or deleted.
+
+    """
+
+    def __init__(self, name, maxsize, ttl):
+        super().__init__(name, maxsize, ttl)
+        self._keys_by_chunk = {}
+
+    @staticmethod
+    def normalize(query):
+        return re.sub(r"[\s?.!]+$", "", " ".join(query.lower().split()))
+
+    def key(self, collection, owner_id, role, query, chunk_ids):
+        return (collection, owner_id, role, self.normalize(query), frozenset(chunk_ids))
+
+    def set(self, key, value):
+        super().set(key, value)
+        with self._lock:
+            for chunk_id in key[-1]:
+                self._keys_by_chunk.setdefault(chunk_id, set()).add(key)
+            if len(self._keys_by_chunk) > self._cache.maxsize * 10:
+                self._prune_index()
+
+    def invalidate_chunks(self, chunk_ids):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                for key in self._keys_by_chunk.pop(chunk_id, ()):
+                    self._cache.pop(key, None)
+
+    def _prune_index(self):
+        # Drop index entries for answers the TTL/LRU policy already evicted
+        for chunk_id in list(self._keys_by_chunk):
+            live = {key for key in self._keys_by_chunk[chunk_id] if key in self._cache}
+            if live:
+                self._keys_by_chunk[chunk_id] = live
+            else:
+                del self._keys_by_chunk[chunk_id]
+
+
+query_embedding_cache = StatsCache("query_embedding", SETTINGS.query_embedding_cache_size, SETTINGS.query_embedding_cache_ttl)
+answer_cache = AnswerCache("answer", SETTINGS.answer_cache_size, SETTINGS.answer_cache_ttl)
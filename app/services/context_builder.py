@@ -0,0 +1,150 @@
+from langchain_core.documents import Document
+from app.core.config import SETTINGS
+from app.services.lexical_index import tokenize
+from app.services.model_registry import registry
+
+# Candidates this similar to an already selected chunk are dropped as duplicates (re-uploads)
+DUPLICATE_SIMILARITY = 0.9
+
+
+class HfTokenizer:
+    """A Hugging Face tokenizer, counting content tokens only (no special tokens)."""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    def encode(self, text):
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def decode(self, tokens):
+        return self.tokenizer.decode(tokens)
+
+
+class CharTokenizer:
+    """
+    Fallback when the LLM's tokenizer is not available locally: about four
+    characters per token, the usual ratio for English text with BPE vocabularies.
+
+    """
+
+    chars_per_token = 4
+
+    def encode(self, text):
+        return [text[i:i + self.chars_per_token] for i in range(0, len(text), self.chars_per_token)]
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+def count_tokens(text):
+    return len(registry.get("tokenizer").encode(text))
+
+
+def truncate_tokens(text, budget):
+    tokenizer = registry.get("tokenizer")
+    return tokenizer.decode(tokenizer.encode(text)[:budget])
+
+
+def token_budget(role):
+    return SETTINGS.role_context_budgets.get(role, SETTINGS.context_token_budget)
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def mmr(docs, lambda_mult=None):
+    """
+    Reorders candidates (given best first) by maximal marginal relevance, using
+    rank as relevance and term overlap as redundancy. Near-duplicates are dropped.
+
+    """
+    lambda_mult = SETTINGS.context_mmr_lambda if lambda_mult is None else lambda_mult
+    terms = [set(tokenize(doc.page_content)) for doc in docs]
+    relevance = [1 - rank / len(docs) for rank in range(len(docs))]
+    redundancy = [0.0] * len(docs)
+    remaining = list(range(len(docs)))
+    selected = []
+    while remaining:
+        best = max(remaining, key=lambda i: lambda_mult * relevance[i] - (1 - lambda_mult) * redundancy[i])
+        remaining.remove(best)
+        if redundancy[best] >= DUPLICATE_SIMILARITY:
+            continue
+        selected.append(best)
+        for i in remaining:
+            redundancy[i] = max(redundancy[i], jaccard(terms[i], terms[best]))
+    return [docs[i] for i in selected]
+
+
+def span_key(doc):
+    metadata = doc.metadata
+    return metadata.get("document_id"), metadata.get("page"), metadata.get("start_seconds")
+
+
+def merge_spans(docs):
+    """
+    Merges chunks from the same document section whose character spans overlap
+    (chunks are split with overlap, so adjacent hits repeat text). Merged chunks keep
+    the position of their first member and list every member in metadata["chunk_ids"].
+
+    """
+    merged = []
+    spans = {}
+    for doc in docs:
+        start = doc.metadata.get("start_index")
+        if start is not None:
+            end = start + len(doc.page_content)
+            for target in spans.get(span_key(doc), []):
+                target_start = target.metadata["start_index"]
+                target_end = target_start + len(target.page_content)
+                if start <= target_end and end >= target_start:
+                    text = target.page_content
+                    if start < target_start:
+                        text = doc.page_content[:target_start - start] + text
+                    if end > target_end:
+                        text += doc.page_content[target_end - start:]
+                    target.page_content = text
+                    target.metadata["start_index"] = min(start, target_start)
+                    target.metadata["chunk_ids"].append(doc.metadata.get("chunk_id"))
+                    break
+            else:
+                copy = Document(
+                    page_content=doc.page_content,
+                    metadata={**doc.metadata, "chunk_ids": [doc.metadata.get("chunk_id")]},
+                )
+                merged.append(copy)
+                spans.setdefault(span_key(doc), []).append(copy)
+            continue
+        merged.append(Document(
+            page_content=doc.page_content,
+            metadata={**doc.metadata, "chunk_ids": [doc.metadata.get("chunk_id")]},
+        ))
+    return merged
+
+
+def pack(docs, budget):
+    """Greedily keeps chunks, in order, while they fit the token budget."""
+    packed = []
+    used = 0
+    for doc in docs:
+        tokens = count_tokens(doc.page_content)
+        if used + tokens > budget:
+            if packed:
+                continue
+            doc.page_content = truncate_tokens(doc.page_content, budget)
+            tokens = budget
+        packed.append(doc)
+        used += tokens
+    return packed, used
+
+
+def build_context(candidates, role):
+    """
+    Turns retrieved candidates (best first) into the prompt context for a role:
+    MMR diversity, overlap merging, then packing to the role's token budget.
+    Returns the packed documents and their token count.
+
+    """
+    return pack(merge_spans(mmr(candidates)), token_budget(role))
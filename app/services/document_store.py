@@ -0,0 +1,59 @@
+import hashlib
+import uuid
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.documents import Document
+
+def file_sha256(filepath, block_size=1024 * 1024):
+    """Returns the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def find_by_hash(db: Session, owner_id: int, content_hash: str):
+    return db.query(Document).filter(
+        Document.owner_id == owner_id, Document.content_hash == content_hash
+    ).first()
+
+def get_document(db: Session, owner_id: int, document_id: str):
+    return db.query(Document).filter(Document.owner_id == owner_id, Document.id == document_id).first()
+
+def list_documents(db: Session, owner_id: int):
+    return db.query(Document).filter(Document.owner_id == owner_id).order_by(Document.created_at.desc()).all()
+
+def get_or_create(db: Session, owner_id: int, base_role: str, content_hash: str, file_type: str, filename: str = None, expires_at=None):
+    """
+    Returns the owner's document for a content hash, creating it if needed.
+    Re-uploading a document resets its expiry.
+    
+    """
+    document = find_by_hash(db, owner_id, content_hash)
+    if document is None:
+        document = Document(
+            id=str(uuid.uuid4()), owner_id=owner_id, base_role=base_role, content_hash=content_hash,
+            file_type=file_type, filename=filename, chunk_ids=[], expires_at=expires_at
+        )
+        db.add(document)
+        try:
+            db.commit()
+            db.refresh(document)
+            return document
+        except IntegrityError:
+            # The same file was uploaded concurrently and the other job created it first
+            db.rollback()
+            document = find_by_hash(db, owner_id, content_hash)
+    if document.expires_at != expires_at:
+        document.expires_at = expires_at
+        db.commit()
+        db.refresh(document)
+    return document
+
+def save_document(db: Session, document: Document, text: str, chunk_ids: list):
+    """Records the extracted text and embedded chunk ids of a document."""
+    document.text = text
+    document.chunk_ids = list(chunk_ids)
+    db.commit()
+    db.refresh(document)
+    return document
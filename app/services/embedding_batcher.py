@@ -0,0 +1,132 @@
+import os
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued_at")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that merges concurrent embed calls into micro-batches.
+
+    Callers block on a future while a single background thread collects requests
+    for up to max_wait_ms (or until max_batch_size texts are queued) and runs
+    them through the wrapped model in one forward pass.
+
+    """
+
+    def __init__(self, base, max_batch_size=64, max_wait_ms=10):
+        self.base = base
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._carry = None
+        self._stats = {
+            "requests": 0,
+            "batches": 0,
+            "texts": 0,
+            "max_batch_size": 0,
+            "queue_wait_seconds_total": 0.0,
+            "queue_wait_seconds_max": 0.0,
+        }
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        # Large requests are sliced so one upload cannot monopolise a batch
+        requests = [
+            _Request(texts[i:i + self.max_batch_size])
+            for i in range(0, len(texts), self.max_batch_size)
+        ]
+        self._ensure_worker()
+        for request in requests:
+            self._queue.put(request)
+        vectors = []
+        for request in requests:
+            vectors.extend(request.future.result())
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        batches = stats["batches"] or 1
+        stats["avg_batch_size"] = round(stats["texts"] / batches, 2)
+        stats["avg_queue_wait_ms"] = round(stats["queue_wait_seconds_total"] / batches * 1000, 3)
+        stats["queue_depth"] = self._queue.qsize()
+        return stats
+
+    def _ensure_worker(self):
+        # The thread is (re)started lazily so a forked process gets its own worker
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid() or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def _collect(self):
+        # A request that did not fit the previous batch starts the next one
+        first, self._carry = self._carry or self._queue.get(), None
+        batch = [first]
+        size = len(first.texts)
+        deadline = first.enqueued_at + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if size + len(request.texts) > self.max_batch_size:
+                self._carry = request
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            texts = [text for request in batch for text in request.texts]
+            try:
+                vectors = self.base.embed_documents(texts)
+            except Exception as e:
+                logger.exception("Embedding batch failed")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in batch:
+                request.future.set_result(vectors[offset:offset + len(request.texts)])
+                offset += len(request.texts)
+
+            waits = [started - request.enqueued_at for request in batch]
+            with self._lock:
+                self._stats["requests"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["texts"] += len(texts)
+                self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(texts))
+                self._stats["queue_wait_seconds_total"] += sum(waits) / len(waits)
+                self._stats["queue_wait_seconds_max"] = max(self._stats["queue_wait_seconds_max"], max(waits))
@@ -1,37 +1,76 @@
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from dotenv import load_dotenv
-import os
+from app.core.config import SETTINGS
+from app.core import metrics
+from app.services import admission, vector_store
+from app.services.cache import answer_cache
+import logging
+import time
 
-#load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-api_key = os.getenv("HUGGINGFACE_API_KEY")
-if not api_key:
-    raise ValueError("HUGGINGFACE_API_KEY not found in environment variables")
-os.environ["HUGGINGFACE_API_KEY"] = api_key
 
-#embedding model
-embedding = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+def section_metadata(section):
+    if section is None:
+        return {}
+    if isinstance(section, dict):
+        return dict(section)
+    return {"page": section}
 
 
-def embedding_vectorstore(data):
+def split_section(text_splitter, section, text):
+    """Splits one (section, text) pair into chunks tagged with its page or segment metadata."""
+    if not text or not text.strip():
+        return []
+    return text_splitter.create_documents([text], [section_metadata(section)])
+
+
+def embedding_vectorstore(data, owner_id, base_role, document_id, progress=None, file_type=""):
     """
-    Splits text into chunks, embeds it, and stores it in a Chroma vector database.
+    Splits text into chunks, embeds it, and stores it in the owner's Chroma collection.
+    data is either a string or an iterable of (section, text) pairs; sections are
+    chunked and written in batches as they arrive, so embedding starts before
+    extraction has finished. Chunk ids are derived from the document id, so
+    re-embedding a document never adds a second copy of its chunks.
     
     """
-    data = [data]
+    sections = [(None, data)] if isinstance(data, str) else data
+    if progress:
+        progress("chunking", 0.4)
 
     # Split the text into chunks
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=60)
-    chunked_text = text_splitter.create_documents(data)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=60, add_start_index=True)
 
+    chunk_ids = []
+    batch = []
+    timings = {"chunking": 0.0, "embedding": 0.0}
 
-    print("Chunked Data:", chunked_text)
+    def write_batch():
+        # Storing in vector db
+        if progress:
+            progress("embedding", 0.6)
+        start = time.perf_counter()
+        ids = [f"{document_id}-{i}" for i in range(len(chunk_ids), len(chunk_ids) + len(batch))]
+        with admission.stage_slot("embedding"):
+            vector_store.add_chunks(batch, ids, owner_id, base_role, document_id)
+        answer_cache.invalidate_chunks(ids)
+        timings["embedding"] += time.perf_counter() - start
+        logger.debug(f"Wrote {len(ids)} chunks for document {document_id}")
+        chunk_ids.extend(ids)
+        batch.clear()
 
-    # Storing in vector db
-    vector_store = Chroma.from_documents(chunked_text, embedding, persist_directory=r"C:\Users\panka\Desktop\document_ai_hub\data\vector_store")
-    
-    return {"message": "Data successfully added to ChromaDB"}
+    for section, text in sections:
+        start = time.perf_counter()
+        chunks = split_section(text_splitter, section, text)
+        timings["chunking"] += time.perf_counter() - start
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= SETTINGS.embedding_write_batch_size:
+                write_batch()
+    if batch:
+        write_batch()
 
+    for stage, seconds in timings.items():
+        metrics.STAGE_SECONDS.labels(stage, file_type, base_role).observe(seconds)
+    metrics.CHUNKS_WRITTEN.labels(file_type, base_role).inc(len(chunk_ids))
+    
+    return {"message": "Data successfully added to ChromaDB", "chunk_ids": chunk_ids}
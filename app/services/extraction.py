@@ -0,0 +1,39 @@
+from app.services.ocr_service import ocr_path, ocr_pages
+from app.services.summarization import extract_pdf_text, iter_pdf_pages
+from app.services.transcription import transcribe_audio, transcript_sections
+
+IMAGE_EXTENSIONS = [".img", ".png", ".jpg", ".jpeg", ".tif", ".tiff"]
+AUDIO_EXTENSIONS = [".mp3", ".wav"]
+
+def extraction_stage(file_extension):
+    if file_extension in IMAGE_EXTENSIONS:
+        return "ocr"
+    if file_extension in AUDIO_EXTENSIONS:
+        return "transcription"
+    return "pdf_extraction"
+
+def extract_text(filepath, file_extension):
+    if file_extension in IMAGE_EXTENSIONS:
+        return ocr_path(filepath)
+    elif file_extension in AUDIO_EXTENSIONS:
+        return transcribe_audio(filepath)
+    elif file_extension == ".pdf":
+        return extract_pdf_text(filepath)
+    raise ValueError(f"unsupported file type: {file_extension}")
+
+def extract_sections(filepath, file_extension):
+    """
+    Extracted text as an iterable of (section, text) pairs, where section is a page
+    number or a metadata dict. PDFs and audio are streamed page by page / segment by
+    segment so chunks are embedded while the rest of the file is still being processed.
+    Nothing is extracted until the first section is requested.
+    
+    """
+    if file_extension == ".pdf":
+        yield from iter_pdf_pages(filepath)
+    elif file_extension in IMAGE_EXTENSIONS:
+        yield from ocr_pages(filepath)
+    elif file_extension in AUDIO_EXTENSIONS:
+        yield from transcript_sections(filepath)
+    else:
+        yield None, extract_text(filepath, file_extension)
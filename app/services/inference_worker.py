@@ -0,0 +1,313 @@
+"""
+Local inference worker: one process that owns the OCR, whisper and embedding
+models and serves every API worker on the host over a Unix socket.
+
+    INFERENCE_WORKER_SOCKET=/run/fastapi-ai-agent/inference.sock INFERENCE_WORKER_AUTHKEY=<secret> \
+        python -m app.services.inference_worker
+
+With INFERENCE_WORKER_SOCKET set, the API registry hands out proxies with the
+models' own interfaces (readtext, transcribe, embed_documents/embed_query) that
+forward calls to the worker. Concurrent embedding requests from all API workers
+are merged by the worker's micro-batcher, and each model runs at most
+INFERENCE_WORKER_CONCURRENCY calls at once. Without the setting the models are
+loaded in-process as before. The API and the worker must share the same
+INFERENCE_WORKER_AUTHKEY.
+"""
+import os
+import sys
+import time
+import signal
+import logging
+import threading
+from multiprocessing.connection import Client, Listener
+from langchain_core.embeddings import Embeddings
+from app.core.config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Models the worker serves; other registry entries stay in the API process
+SERVED = ("embedding", "ocr", "whisper")
+
+# op name -> model it runs on
+OPS = {
+    "embed_documents": "embedding",
+    "embed_query": "embedding",
+    "readtext": "ocr",
+    "transcribe": "whisper",
+}
+
+
+class InferenceWorkerError(Exception):
+    """Raised in the API process when the worker fails or cannot be reached."""
+
+
+def authkey():
+    # The socket carries pickles, so there is no default key to fall back on
+    if not SETTINGS.inference_worker_authkey:
+        raise InferenceWorkerError("INFERENCE_WORKER_AUTHKEY must be set to use the inference worker")
+    return SETTINGS.inference_worker_authkey.encode()
+
+
+# worker side
+
+class InferenceServer:
+    """Accepts API worker connections and runs their calls under per-model limits."""
+
+    def __init__(self, address):
+        from app.services.model_registry import registry
+        self.address = address
+        self.registry = registry
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._limits = {
+            name: threading.BoundedSemaphore(SETTINGS.inference_worker_concurrency.get(name, 1)) for name in SERVED
+        }
+        self._in_flight = {name: 0 for name in SERVED}
+        self._calls = {name: 0 for name in SERVED}
+        self._errors = {name: 0 for name in SERVED}
+        self._connections = 0
+
+    def run_op(self, op, args, kwargs):
+        name = OPS[op]
+        model = self.registry.get(name)
+        with self._limits[name]:
+            with self._lock:
+                self._in_flight[name] += 1
+            try:
+                return getattr(model, op)(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self._errors[name] += 1
+                raise
+            finally:
+                with self._lock:
+                    self._in_flight[name] -= 1
+                    self._calls[name] += 1
+
+    def health(self):
+        models = self.registry.status()
+        with self._lock:
+            health = {
+                "pid": os.getpid(),
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "connections": self._connections,
+                "models": {
+                    name: dict(
+                        models[name],
+                        limit=SETTINGS.inference_worker_concurrency.get(name, 1),
+                        in_flight=self._in_flight[name],
+                        calls=self._calls[name],
+                        errors=self._errors[name],
+                    )
+                    for name in SERVED
+                },
+            }
+        if self.registry.is_loaded("embedding") and hasattr(self.registry.get("embedding"), "stats"):
+            health["embedding"] = self.registry.get("embedding").stats()
+        return health
+
+    def handle(self, conn):
+        with self._lock:
+            self._connections += 1
+        try:
+            while True:
+                try:
+                    op, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if op == "health":
+                        result = self.health()
+                    elif op in OPS:
+                        result = self.run_op(op, args, kwargs)
+                    else:
+                        raise ValueError(f"Unknown op: {op}")
+                    conn.send(("ok", result))
+                except Exception as e:
+                    logger.exception(f"Inference op '{op}' failed")
+                    conn.send(("error", f"{type(e).__name__}: {str(e)}"))
+        finally:
+            with self._lock:
+                self._connections -= 1
+            conn.close()
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        os.makedirs(os.path.dirname(self.address) or ".", exist_ok=True)
+        # Only the owner may connect; the socket is created with these permissions
+        previous_umask = os.umask(0o177)
+        try:
+            listener = Listener(self.address, family="AF_UNIX", authkey=authkey())
+        finally:
+            os.umask(previous_umask)
+        with listener:
+            logger.info(f"Inference worker {os.getpid()} listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    # A client that fails the authkey handshake must not stop the server
+                    logger.warning(f"Rejected inference worker connection: {str(e)}")
+                    continue
+                threading.Thread(target=self.handle, args=(conn,), name="inference-conn", daemon=True).start()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    address = SETTINGS.inference_worker_socket
+    if not address:
+        sys.exit("INFERENCE_WORKER_SOCKET is not set")
+    if not SETTINGS.inference_worker_authkey:
+        sys.exit("INFERENCE_WORKER_AUTHKEY is not set")
+    # The worker loads the real models; its own registry must not proxy back to itself
+    SETTINGS.inference_worker_socket = ""
+    from app.services.model_registry import registry, warmup_names
+    server = InferenceServer(address)
+    registry.warmup([name for name in warmup_names() or SERVED if name in SERVED])
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    finally:
+        if os.path.exists(address):
+            os.unlink(address)
+
+
+# API side
+
+class WorkerClient:
+    """
+    Pool of connections to the worker, one in use per calling thread. The pool
+    is per process, so forked API workers open their own connections.
+
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self._lock = threading.Lock()
+        self._idle = []
+        self._pid = os.getpid()
+
+    def _acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle, self._pid = [], os.getpid()
+            if self._idle:
+                return self._idle.pop()
+        return Client(self.address, family="AF_UNIX", authkey=authkey())
+
+    def _release(self, conn):
+        with self._lock:
+            if self._pid == os.getpid():
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def call(self, op, *args, **kwargs):
+        try:
+            conn = self._acquire()
+        except OSError as e:
+            raise InferenceWorkerError(f"Inference worker unavailable at {self.address}: {str(e)}") from e
+        try:
+            conn.send((op, args, kwargs))
+            if not conn.poll(SETTINGS.inference_worker_timeout):
+                raise TimeoutError(f"no reply within {SETTINGS.inference_worker_timeout}s")
+            status, result = conn.recv()
+        except (OSError, EOFError, TimeoutError) as e:
+            # The reply may still arrive later, so the connection cannot be reused
+            conn.close()
+            raise InferenceWorkerError(f"Inference worker call '{op}' failed: {str(e)}") from e
+        self._release(conn)
+        if status != "ok":
+            raise InferenceWorkerError(result)
+        return result
+
+    def health(self):
+        return self.call("health")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def client():
+    global _client
+    with _client_lock:
+        if _client is None or _client.address != SETTINGS.inference_worker_socket:
+            _client = WorkerClient(SETTINGS.inference_worker_socket)
+        return _client
+
+def enabled():
+    return bool(SETTINGS.inference_worker_socket)
+
+def health():
+    """Worker health for /ready and /stats, or None when models run in-process."""
+    if not enabled():
+        return None
+    try:
+        return dict(client().health(), reachable=True)
+    except InferenceWorkerError as e:
+        return {"reachable": False, "error": str(e)}
+
+
+class RemoteModel:
+    """
+    Forwards a model's methods to the worker. With INFERENCE_WORKER_FALLBACK the
+    model is loaded in-process instead while the worker cannot be reached.
+
+    """
+
+    def __init__(self, name, fallback_loader=None):
+        self.name = name
+        self._fallback_loader = fallback_loader
+        self._fallback = None
+        self._fallback_lock = threading.Lock()
+
+    def _local(self):
+        with self._fallback_lock:
+            if self._fallback is None:
+                logger.warning(f"Inference worker unreachable, loading '{self.name}' in-process")
+                self._fallback = self._fallback_loader()
+            return self._fallback
+
+    def _call(self, op, *args, **kwargs):
+        try:
+            return client().call(op, *args, **kwargs)
+        except InferenceWorkerError as e:
+            # Only connection failures fall back; errors raised by the model propagate, and
+            # so do timeouts (TimeoutError is an OSError): a busy worker is not a missing one
+            cause = e.__cause__
+            connection_failed = isinstance(cause, OSError) and not isinstance(cause, TimeoutError)
+            if not (SETTINGS.inference_worker_fallback and self._fallback_loader and connection_failed):
+                raise
+        return getattr(self._local(), op)(*args, **kwargs)
+
+
+class RemoteReader(RemoteModel):
+    def readtext(self, image, **kwargs):
+        return self._call("readtext", image, **kwargs)
+
+
+class RemoteWhisper(RemoteModel):
+    def transcribe(self, audio, **kwargs):
+        return self._call("transcribe", audio, **kwargs)
+
+
+class RemoteEmbeddings(RemoteModel, Embeddings):
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        return self._call("embed_documents", texts)
+
+    def embed_query(self, text):
+        return self._call("embed_query", text)
+
+
+REMOTE = {"embedding": RemoteEmbeddings, "ocr": RemoteReader, "whisper": RemoteWhisper}
+
+def remote(name, fallback_loader=None):
+    return REMOTE[name](name, fallback_loader)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from app.core.config import SETTINGS
+from app.core.processes import pid_alive
+
+logger = logging.getLogger(__name__)
+
+# Stages reported by the ingestion pipeline, in order
+STAGES = ("queued", "extracting", "chunking", "embedding", "answering", "completed", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    progress REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs(updated_at);
+"""
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue already holds the maximum number of pending jobs."""
+
+
+class Job:
+    """State of a single background job."""
+
+    def __init__(self, owner, store=None):
+        self.id = str(uuid.uuid4())
+        self.owner = owner
+        self.pid = os.getpid()
+        self.store = store
+        self.stage = "queued"
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    @property
+    def done(self):
+        return self.stage in ("completed", "failed")
+
+    def update(self, stage, progress=None):
+        """Progress callback handed to the pipeline."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown job stage: {stage}")
+        self.stage = stage
+        if progress is not None:
+            self.progress = round(float(progress), 3)
+        self.updated_at = time.time()
+        if self.store is not None:
+            self.store.save(self)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "stage": self.stage,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobStore:
+    """
+    Job records shared by every worker process on the host, kept in a SQLite
+    file, so a status poll can be answered by any worker. A job whose worker
+    exited before it finished is reported as failed.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def save(self, job):
+        # A failed status write must not fail the job itself
+        try:
+            with closing(self.connect()) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        job.id, job.owner, job.pid, job.stage, job.progress,
+                        None if job.result is None else json.dumps(job.result, default=str),
+                        job.error, job.created_at, job.updated_at,
+                    ),
+                )
+        except sqlite3.Error:
+            logger.exception(f"Could not record job {job.id}")
+
+    def load(self, job_id):
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT owner, pid, stage, progress, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = Job(row[0])
+        job.id = job_id
+        job.pid, job.stage, job.progress = row[1], row[2], row[3]
+        job.result = None if row[4] is None else json.loads(row[4])
+        job.error, job.created_at, job.updated_at = row[5], row[6], row[7]
+        if not job.done and not pid_alive(job.pid):
+            job.stage, job.error = "failed", "Worker exited before the job finished"
+        return job
+
+    def prune(self, cutoff):
+        with closing(self.connect()) as conn:
+            conn.execute("DELETE FROM jobs WHERE stage IN ('completed', 'failed') AND updated_at < ?", (cutoff,))
+
+
+class JobQueue:
+    """
+    Runs pipeline jobs on a bounded thread pool so request handlers return immediately.
+    Job state is also written to a JobStore, so any worker can report it.
+
+    """
+
+    def __init__(self, max_workers, max_pending, ttl_seconds, store=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self.store = store
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        # Created on first use so the pool's threads belong to the serving process
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingestion")
+        return self._executor
+
+    def pending(self):
+        return sum(1 for job in self._jobs.values() if not job.done)
+
+    def submit(self, owner, func, *args, **kwargs):
+        """
+        Queues func(*args, progress=job.update, **kwargs) and returns the Job.
+
+        """
+        with self._lock:
+            self._prune()
+            if self.pending() >= self.max_pending:
+                raise QueueFullError("Too many jobs in progress, try again later")
+            job = Job(owner, self.store)
+            self._jobs[job.id] = job
+            if self.store is not None:
+                self.store.save(job)
+            self._get_executor().submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        """The live job if it runs in this process, otherwise its shared record."""
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = self.store.load(job_id)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        try:
+            result = func(*args, progress=job.update, **kwargs)
+            if isinstance(result, dict) and "error" in result:
+                job.error = result["error"]
+                job.update("failed")
+            else:
+                job.result = result
+                job.update("completed", 1.0)
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed")
+            job.error = str(e)
+            job.update("failed")
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.done and job.updated_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if self.store is not None:
+            self.store.prune(cutoff)
+
+
+job_queue = JobQueue(
+    max_workers=SETTINGS.ingestion_workers,
+    max_pending=SETTINGS.ingestion_queue_size,
+    ttl_seconds=SETTINGS.job_ttl_seconds,
+    store=JobStore(SETTINGS.job_store),
+)
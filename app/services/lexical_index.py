@@ -0,0 +1,162 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from langchain_core.documents import Document
+from app.core.config import SETTINGS
+from app.services.sqlite_connections import ThreadConnections
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._/-][a-z0-9]+)*")
+# Clause numbers, amounts, account codes and ticker-like tokens
+EXACT_TERM_PATTERN = re.compile(r"\b(?:[A-Z]{2,6}|\w*\d[\w./-]*)\b")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the this to was "
+    "were what when where which who why will with do does did can you your me my we our".split()
+)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id TEXT PRIMARY KEY,
+    owner_id INTEGER,
+    document_id TEXT,
+    length INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_owner ON chunks(owner_id);
+CREATE INDEX IF NOT EXISTS chunks_document ON chunks(document_id);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    chunk_id TEXT NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, chunk_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_chunk ON postings(chunk_id);
+"""
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def exact_terms(query):
+    """Query tokens that only make sense as exact matches (numbers, codes, tickers)."""
+    return {token.lower() for token in EXACT_TERM_PATTERN.findall(query)}
+
+
+def index_path(collection):
+    return os.path.join(SETTINGS.vector_store_dir, "lexical", f"{collection}.sqlite3")
+
+
+_connections = ThreadConnections(SCHEMA)
+
+def connect(collection):
+    """The calling thread's connection to the collection's index; do not close it."""
+    return _connections.get(index_path(collection))
+
+
+def add(collection, chunks, ids):
+    """Adds (or replaces) chunks in the collection's inverted index."""
+    with connect(collection) as conn:
+        _delete(conn, ids)
+        for chunk_id, chunk in zip(ids, chunks):
+            terms = Counter(tokenize(chunk.page_content))
+            conn.execute(
+                "INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?)",
+                (chunk_id, chunk.metadata.get("owner_id"), chunk.metadata.get("document_id"),
+                 sum(terms.values()), chunk.page_content, json.dumps(chunk.metadata)),
+            )
+            conn.executemany(
+                "INSERT INTO postings VALUES (?, ?, ?)",
+                [(term, chunk_id, tf) for term, tf in terms.items()],
+            )
+
+
+def delete(collection, ids):
+    with connect(collection) as conn:
+        _delete(conn, ids)
+
+
+def drop(collection):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(index_path(collection) + suffix):
+            os.remove(index_path(collection) + suffix)
+
+
+def _delete(conn, ids):
+    for start in range(0, len(ids), 500):
+        batch = list(ids[start:start + 500])
+        marks = ",".join("?" * len(batch))
+        conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({marks})", batch)
+        conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({marks})", batch)
+
+
+def search(collection, query, owner_id, k=3, document_id=None):
+    """
+    BM25 search over the owner's chunks in a collection. Returns (Document, score)
+    pairs, best first. Needs no embedding call.
+
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms or not os.path.exists(index_path(collection)):
+        return []
+
+    scope = "c.owner_id = ?"
+    scope_args = [owner_id]
+    if document_id is not None:
+        scope += " AND c.document_id = ?"
+        scope_args.append(document_id)
+    marks = ",".join("?" * len(terms))
+
+    conn = connect(collection)
+    total, avg_length = conn.execute(
+        f"SELECT COUNT(*), AVG(length) FROM chunks c WHERE {scope}", scope_args
+    ).fetchone()
+    if not total:
+        return []
+    rows = conn.execute(
+        f"SELECT p.term, p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c ON c.chunk_id = p.chunk_id "
+        f"WHERE p.term IN ({marks}) AND {scope}",
+        terms + scope_args,
+    ).fetchall()
+
+    document_frequency = Counter(term for term, _, _, _ in rows)
+    scores = Counter()
+    for term, chunk_id, tf, length in rows:
+        df = document_frequency[term]
+        idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+        norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / (avg_length or 1))
+        scores[chunk_id] += idf * tf * (BM25_K1 + 1) / norm
+
+    top = scores.most_common(k)
+    if not top:
+        return []
+    found = {
+        chunk_id: (content, metadata)
+        for chunk_id, content, metadata in conn.execute(
+            f"SELECT chunk_id, content, metadata FROM chunks WHERE chunk_id IN ({','.join('?' * len(top))})",
+            [chunk_id for chunk_id, _ in top],
+        )
+    }
+
+    return [
+        (Document(page_content=found[chunk_id][0], metadata=json.loads(found[chunk_id][1])), score)
+        for chunk_id, score in top
+        if chunk_id in found
+    ]
+
+
+def is_confident(query, results):
+    """
+    True when the lexical results alone can answer the query: the query contains
+    exact-match tokens (clause numbers, codes, tickers) and the best hit has all of them.
+
+    """
+    terms = exact_terms(query)
+    if not terms or not results:
+        return False
+    top_terms = set(tokenize(results[0][0].page_content))
+    return all(term in top_terms for term in terms)
@@ -0,0 +1,197 @@
+import fcntl
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from app.core.config import SETTINGS
+from app.core.database import SessionLocal
+from app.models.documents import CollectionStats, Document, TenantRetention
+from app.services import vector_store
+from app.services.cache import answer_cache
+
+logger = logging.getLogger(__name__)
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def tenant_ttl(db: Session, owner_id: int):
+    retention = db.get(TenantRetention, owner_id)
+    if retention is not None and retention.document_ttl_seconds is not None:
+        return retention.document_ttl_seconds
+    return SETTINGS.document_ttl_seconds
+
+
+def set_tenant_ttl(db: Session, owner_id: int, ttl_seconds: int | None):
+    retention = db.get(TenantRetention, owner_id) or TenantRetention(owner_id=owner_id)
+    retention.document_ttl_seconds = ttl_seconds
+    db.add(retention)
+    db.commit()
+    return retention
+
+
+def expiry(db: Session, owner_id: int, ttl_seconds: int | None = None):
+    """
+    Expiry time for a new document: its own TTL if given, else the tenant's,
+    else DOCUMENT_TTL_SECONDS. A TTL of 0 means the document never expires.
+
+    """
+    if ttl_seconds is None:
+        ttl_seconds = tenant_ttl(db, owner_id)
+    if not ttl_seconds:
+        return None
+    return utcnow() + timedelta(seconds=ttl_seconds)
+
+
+def record_deleted(db: Session, name: str, count: int):
+    stats = db.get(CollectionStats, name) or CollectionStats(name=name, deleted_vectors=0)
+    stats.deleted_vectors += count
+    db.add(stats)
+
+
+def delete_document(db: Session, document: Document):
+    """Removes a document's vectors, lexical entries, cached answers and its record."""
+    chunk_ids = list(document.chunk_ids or [])
+    name = vector_store.delete_chunks(document.owner_id, document.base_role, chunk_ids)
+    answer_cache.invalidate_chunks(chunk_ids)
+    record_deleted(db, name, len(chunk_ids))
+    db.delete(document)
+    db.commit()
+
+
+def delete_tenant(owner_id: int):
+    """
+    Deletes every document a user owns. With per-owner partitions the whole
+    collection is dropped, so nothing is left to compact.
+
+    """
+    db = SessionLocal()
+    try:
+        documents = db.query(Document).filter(Document.owner_id == owner_id).all()
+        if SETTINGS.vector_partition == "role":
+            for document in documents:
+                delete_document(db, document)
+        else:
+            for document in documents:
+                answer_cache.invalidate_chunks(document.chunk_ids or [])
+                db.delete(document)
+            name = vector_store.collection_name(owner_id, None)
+            vector_store.drop_collection(name)
+            stats = db.get(CollectionStats, name)
+            if stats is not None:
+                db.delete(stats)
+        retention = db.get(TenantRetention, owner_id)
+        if retention is not None:
+            db.delete(retention)
+        db.commit()
+        logger.info(f"Deleted {len(documents)} documents of user {owner_id}")
+        return len(documents)
+    finally:
+        db.close()
+
+
+def expire_documents(db: Session, now=None):
+    expired = db.query(Document).filter(Document.expires_at.isnot(None), Document.expires_at <= (now or utcnow())).all()
+    for document in expired:
+        delete_document(db, document)
+    return len(expired)
+
+
+def compact_collections(db: Session):
+    """Rebuilds collections whose deleted vectors exceed COMPACTION_THRESHOLD of the total."""
+    compacted = []
+    names = set(vector_store.collection_names())
+    for stats in db.query(CollectionStats).filter(CollectionStats.deleted_vectors >= SETTINGS.compaction_min_deleted).all():
+        if stats.name not in names:
+            db.delete(stats)
+            continue
+        live = vector_store.count(stats.name)
+        if stats.deleted_vectors / (stats.deleted_vectors + live) < SETTINGS.compaction_threshold:
+            continue
+        logger.info(f"Compacting {stats.name}: {live} live, {stats.deleted_vectors} deleted vectors")
+        vector_store.compact(stats.name)
+        stats.deleted_vectors = 0
+        stats.compacted_at = utcnow()
+        compacted.append(stats.name)
+    db.commit()
+    return compacted
+
+
+def run_maintenance():
+    db = SessionLocal()
+    try:
+        expired = expire_documents(db)
+        compacted = compact_collections(db)
+        return {"expired_documents": expired, "compacted_collections": compacted}
+    finally:
+        db.close()
+
+
+@contextmanager
+def maintenance_turn(interval):
+    """
+    Yields True in the one worker process whose turn it is to run maintenance:
+    rounds are serialized by a file lock and spaced by the lock file's mtime.
+
+    """
+    path = os.path.join(SETTINGS.vector_store_dir, ".maintenance.lock")
+    os.makedirs(SETTINGS.vector_store_dir, exist_ok=True)
+    with open(path, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            due = time.time() - os.path.getmtime(path) >= interval * 0.9
+            yield due
+            if due:
+                os.utime(path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class MaintenanceThread(threading.Thread):
+    """Periodically expires documents and compacts collections in the background."""
+
+    def __init__(self, interval):
+        super().__init__(name="document-lifecycle", daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                with maintenance_turn(self.interval) as due:
+                    if not due:
+                        continue
+                    result = run_maintenance()
+                if result["expired_documents"] or result["compacted_collections"]:
+                    logger.info(f"Document maintenance: {result}")
+            except Exception:
+                logger.exception("Document maintenance failed")
+
+    def stop(self):
+        self.stopped.set()
+
+
+maintenance = None
+
+
+def start_maintenance():
+    global maintenance
+    if SETTINGS.lifecycle_interval_seconds > 0 and maintenance is None:
+        maintenance = MaintenanceThread(SETTINGS.lifecycle_interval_seconds)
+        maintenance.start()
+    return maintenance
+
+
+def stop_maintenance():
+    global maintenance
+    if maintenance is not None:
+        maintenance.stop()
+        maintenance = None
@@ -0,0 +1,379 @@
+import fcntl
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+import numpy as np
+from langchain_core.documents import Document
+from app.core.config import SETTINGS
+from app.services.sqlite_connections import ThreadConnections
+from app.services.vector_backends import VectorBackend
+
+DTYPES = {"float16": np.float16, "int8": np.int8}
+INT8_SCALE = 127.0
+SEARCH_BLOCK_ROWS = 65536
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS rows (
+    row INTEGER PRIMARY KEY,
+    chunk_id TEXT NOT NULL,
+    owner_id INTEGER,
+    document_id TEXT,
+    list_id INTEGER,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rows_chunk ON rows(chunk_id);
+CREATE INDEX IF NOT EXISTS rows_scope ON rows(owner_id, document_id, list_id);
+"""
+
+_connections = ThreadConnections(SCHEMA)
+
+
+def normalize(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+
+
+def encode(vectors, dtype):
+    """Stores unit vectors as float16, or as int8 scaled by 127."""
+    if dtype == "int8":
+        return np.clip(np.round(vectors * INT8_SCALE), -127, 127).astype(np.int8)
+    return vectors.astype(np.float16)
+
+
+def decode(vectors, dtype):
+    vectors = vectors.astype(np.float32)
+    return vectors / INT8_SCALE if dtype == "int8" else vectors
+
+
+def kmeans(vectors, lists, iterations=10, seed=0):
+    """Spherical k-means over unit vectors; returns unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for i in range(lists):
+            members = vectors[assignment == i]
+            if len(members):
+                centroids[i] = members.mean(axis=0)
+        centroids = normalize(centroids)
+    return centroids
+
+
+class MmapIndex:
+    """
+    One collection stored as a flat, memory-mapped array of unit vectors
+    (float16 or int8) plus a SQLite sidecar holding each row's chunk id,
+    owner, document, IVF list, tombstone and content.
+
+    Rows are only ever appended; deletes are tombstones until compact() rewrites
+    the file under a new version. Readers map whatever version the sidecar names,
+    so several processes can share one page-cached file. Writers serialize on a
+    file lock.
+
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._mapped = (None, None, None)  # (path, rows, array)
+        self._centroids = (None, None)  # (generation, array)
+        self._scopes = {}
+
+    # storage
+
+    def meta_path(self):
+        return os.path.join(self.directory, "meta.sqlite3")
+
+    def vectors_path(self, state):
+        return os.path.join(self.directory, f"vectors.{state['version']}.{state['dtype']}")
+
+    def centroids_path(self):
+        return os.path.join(self.directory, "centroids.npy")
+
+    def connect(self):
+        """The calling thread's connection to the sidecar; do not close it."""
+        return _connections.get(self.meta_path())
+
+    @staticmethod
+    def state(conn):
+        state = {"version": "0", "generation": "0", "dim": "0", "dtype": SETTINGS.mmap_dtype, "ivf_generation": ""}
+        state.update(conn.execute("SELECT key, value FROM state").fetchall())
+        return state
+
+    @staticmethod
+    def set_state(conn, **values):
+        conn.executemany(
+            "INSERT INTO state VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            [(key, str(value)) for key, value in values.items()],
+        )
+
+    @staticmethod
+    def bump(conn, state):
+        state["generation"] = str(int(state["generation"]) + 1)
+        MmapIndex.set_state(conn, generation=state["generation"])
+
+    @contextmanager
+    def writing(self):
+        """Serializes writers across threads and processes; yields a connection in a transaction."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with self.connect() as conn:
+                    yield conn
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def mapped(self, state):
+        """The vectors file of the given state, memory-mapped read-only (remapped as it grows)."""
+        path = self.vectors_path(state)
+        dim = int(state["dim"])
+        itemsize = np.dtype(DTYPES[state["dtype"]]).itemsize
+        rows = os.path.getsize(path) // (dim * itemsize) if os.path.exists(path) else 0
+        cached_path, cached_rows, array = self._mapped
+        if cached_path != path or cached_rows != rows:
+            array = np.memmap(path, dtype=DTYPES[state["dtype"]], mode="r", shape=(rows, dim)) if rows else None
+            self._mapped = (path, rows, array)
+        return array
+
+    # writes
+
+    def add(self, ids, texts, metadatas, embeddings):
+        vectors = normalize(embeddings)
+        with self.writing() as conn:
+            state = self.state(conn)
+            if state["dim"] == "0":
+                state["dim"] = str(vectors.shape[1])
+                self.set_state(conn, dim=state["dim"], dtype=state["dtype"], version=state["version"])
+            elif int(state["dim"]) != vectors.shape[1]:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {state['dim']}")
+
+            self._tombstone(conn, ids)
+            path = self.vectors_path(state)
+            itemsize = np.dtype(DTYPES[state["dtype"]]).itemsize
+            start = os.path.getsize(path) // (vectors.shape[1] * itemsize) if os.path.exists(path) else 0
+            with open(path, "ab") as f:
+                f.write(encode(vectors, state["dtype"]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            centroids = self.centroids(state)
+            list_ids = np.argmax(vectors @ centroids.T, axis=1).tolist() if centroids is not None else [None] * len(ids)
+            conn.executemany(
+                "INSERT INTO rows (row, chunk_id, owner_id, document_id, list_id, content, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (start + i, chunk_id, metadata.get("owner_id"), metadata.get("document_id"), list_id, text, json.dumps(metadata))
+                    for i, (chunk_id, text, metadata, list_id) in enumerate(zip(ids, texts, metadatas, list_ids))
+                ],
+            )
+            self.bump(conn, state)
+            needs_training = (
+                SETTINGS.mmap_ivf_lists > 0 and not state["ivf_generation"]
+                and self._live(conn) >= SETTINGS.mmap_ivf_min_rows
+            )
+        if needs_training:
+            self.train()
+
+    def delete(self, ids):
+        with self.writing() as conn:
+            deleted = self._tombstone(conn, ids)
+            self.bump(conn, self.state(conn))
+        return deleted
+
+    @staticmethod
+    def _tombstone(conn, ids):
+        deleted = 0
+        for start in range(0, len(ids), 500):
+            batch = list(ids[start:start + 500])
+            deleted += conn.execute(
+                f"UPDATE rows SET deleted = 1 WHERE deleted = 0 AND chunk_id IN ({','.join('?' * len(batch))})", batch
+            ).rowcount
+        return deleted
+
+    @staticmethod
+    def _live(conn):
+        return conn.execute("SELECT COUNT(*) FROM rows WHERE deleted = 0").fetchone()[0]
+
+    def count(self):
+        return self._live(self.connect())
+
+    def compact(self):
+        """Rewrites the live rows into a new vectors file (in the configured dtype) and renumbers them."""
+        with self.writing() as conn:
+            state = self.state(conn)
+            live = np.fromiter((row for (row,) in conn.execute("SELECT row FROM rows WHERE deleted = 0 ORDER BY row")), dtype=np.int64)
+            old_path = self.vectors_path(state)
+            new_state = dict(state, version=str(int(state["version"]) + 1), dtype=SETTINGS.mmap_dtype)
+            if state["dim"] != "0":
+                vectors = self.mapped(state)
+                with open(self.vectors_path(new_state), "wb") as f:
+                    for start in range(0, len(live), SEARCH_BLOCK_ROWS):
+                        block = decode(vectors[live[start:start + SEARCH_BLOCK_ROWS]], state["dtype"])
+                        f.write(encode(block, new_state["dtype"]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            conn.execute("DELETE FROM rows WHERE deleted = 1")
+            # Renumber in two passes so the primary key never collides
+            conn.executemany("UPDATE rows SET row = ? WHERE row = ?", [(-i - 1, int(row)) for i, row in enumerate(live)])
+            conn.execute("UPDATE rows SET row = -row - 1")
+            self.set_state(conn, version=new_state["version"], dtype=new_state["dtype"])
+            self.bump(conn, new_state)
+        if os.path.exists(old_path):
+            # Readers that still map the old file keep it alive until they remap
+            os.remove(old_path)
+        if SETTINGS.mmap_ivf_lists > 0 and len(live) >= SETTINGS.mmap_ivf_min_rows:
+            self.train()
+        return len(live)
+
+    def train(self):
+        """Clusters the live vectors into IVF lists and assigns every row to its nearest list."""
+        with self.writing() as conn:
+            state = self.state(conn)
+            live = np.fromiter((row for (row,) in conn.execute("SELECT row FROM rows WHERE deleted = 0")), dtype=np.int64)
+            lists = min(SETTINGS.mmap_ivf_lists, len(live))
+            if not lists:
+                return
+            vectors = self.mapped(state)
+            rng = np.random.default_rng(0)
+            sample = np.sort(rng.choice(live, min(len(live), lists * 256), replace=False))
+            centroids = kmeans(decode(vectors[sample], state["dtype"]), lists)
+
+            assignments = []
+            for start in range(0, len(live), SEARCH_BLOCK_ROWS):
+                block = live[start:start + SEARCH_BLOCK_ROWS]
+                nearest = np.argmax(decode(vectors[block], state["dtype"]) @ centroids.T, axis=1)
+                assignments.extend(zip(nearest.tolist(), block.tolist()))
+            conn.executemany("UPDATE rows SET list_id = ? WHERE row = ?", assignments)
+
+            tmp = self.centroids_path() + ".tmp.npy"
+            np.save(tmp, centroids)
+            os.replace(tmp, self.centroids_path())
+            self.bump(conn, state)
+            self.set_state(conn, ivf_generation=state["generation"])
+
+    # reads
+
+    def centroids(self, state):
+        if not state["ivf_generation"] or not os.path.exists(self.centroids_path()):
+            return None
+        generation, centroids = self._centroids
+        if generation != state["ivf_generation"]:
+            centroids = np.load(self.centroids_path())
+            self._centroids = (state["ivf_generation"], centroids)
+        return centroids
+
+    def scope_rows(self, conn, state, where, query):
+        """Live rows matching the filter (and, with IVF, the nearest lists), cached per generation."""
+        clauses, args = ["deleted = 0"], []
+        for key in ("owner_id", "document_id"):
+            if where and key in where:
+                clauses.append(f"{key} = ?")
+                args.append(where[key])
+        centroids = self.centroids(state)
+        if centroids is not None:
+            probes = np.argsort(-(centroids @ query))[:SETTINGS.mmap_ivf_probes].tolist()
+            clauses.append(f"list_id IN ({','.join('?' * len(probes))})")
+            args.extend(probes)
+
+        key = (state["version"], state["generation"], tuple(clauses), tuple(args))
+        rows = self._scopes.get(key)
+        if rows is None:
+            rows = np.fromiter(
+                (row for (row,) in conn.execute(f"SELECT row FROM rows WHERE {' AND '.join(clauses)} ORDER BY row", args)),
+                dtype=np.int64,
+            )
+            if len(self._scopes) >= 256 or any(k[:2] != key[:2] for k in self._scopes):
+                self._scopes.clear()
+            self._scopes[key] = rows
+        return rows
+
+    def search(self, embedding, k, where=None):
+        query = normalize(embedding)[0]
+        conn = self.connect()
+        state = self.state(conn)
+        if state["dim"] == "0":
+            return []
+        rows = self.scope_rows(conn, state, where, query)
+        if not len(rows):
+            return []
+        vectors = self.mapped(state)
+
+        if len(rows) == len(vectors) and rows[-1] == len(vectors) - 1:
+            # Whole file in scope: score contiguous blocks straight off the mapping
+            scores = np.concatenate([
+                vectors[start:start + SEARCH_BLOCK_ROWS].astype(np.float32) @ query
+                for start in range(0, len(vectors), SEARCH_BLOCK_ROWS)
+            ])
+        else:
+            scores = np.concatenate([
+                vectors[rows[start:start + SEARCH_BLOCK_ROWS]].astype(np.float32) @ query
+                for start in range(0, len(rows), SEARCH_BLOCK_ROWS)
+            ])
+        if state["dtype"] == "int8":
+            scores /= INT8_SCALE
+
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        top_rows = [int(rows[i]) for i in top]
+        found = {
+            row: (content, metadata)
+            for row, content, metadata in conn.execute(
+                f"SELECT row, content, metadata FROM rows WHERE row IN ({','.join('?' * len(top_rows))})", top_rows
+            )
+        }
+
+        return [
+            (Document(page_content=found[row][0], metadata=json.loads(found[row][1])), 1.0 - float(scores[i]))
+            for row, i in zip(top_rows, top)
+            if row in found
+        ]
+
+
+class MmapBackend(VectorBackend):
+    """Collections as memory-mapped quantized vector files under one directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def index(self, name):
+        index = self._indexes.get(name)
+        if index is None:
+            with self._lock:
+                index = self._indexes.setdefault(name, MmapIndex(os.path.join(self.directory, name)))
+        return index
+
+    def add(self, name, ids, texts, metadatas, embeddings):
+        self.index(name).add(ids, texts, metadatas, embeddings)
+
+    def delete(self, name, ids):
+        return self.index(name).delete(list(ids))
+
+    def search(self, name, embedding, k, where=None):
+        if not os.path.exists(os.path.join(self.directory, name)):
+            return []
+        return self.index(name).search(embedding, k, where)
+
+    def count(self, name):
+        return self.index(name).count()
+
+    def collections(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if os.path.isdir(os.path.join(self.directory, name)))
+
+    def drop(self, name):
+        with self._lock:
+            self._indexes.pop(name, None)
+        shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def compact(self, name):
+        return self.index(name).compact()
@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+import logging
+from dotenv import load_dotenv
+from app.core.config import SETTINGS
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of heavy models. Each model is loaded once, either on
+    first use or during warmup, and the same instance is shared by every caller.
+
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._fork_safe = {}
+        self._models = {}
+        self._load_seconds = {}
+        self._errors = {}
+        self._locks = {}
+
+    def register(self, name, loader, fork_safe=True):
+        """
+        fork_safe=False marks models that hold sockets, database connections or
+        native thread pools, which must be created in the process that uses them.
+        
+        """
+        self._loaders[name] = loader
+        self._fork_safe[name] = fork_safe
+        self._locks[name] = threading.Lock()
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        with self._locks[name]:
+            if name not in self._models:
+                logger.info(f"Loading model '{name}'")
+                start = time.perf_counter()
+                try:
+                    self._models[name] = self._loaders[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._load_seconds[name] = round(time.perf_counter() - start, 3)
+                self._errors.pop(name, None)
+                logger.info(f"Loaded model '{name}' in {self._load_seconds[name]}s")
+        return self._models[name]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warmup(self, names=None):
+        """Loads the given models (all registered models by default)."""
+        for name in names or list(self._loaders):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Warmup of model '{name}' failed: {str(e)}")
+
+    def preload(self, names=None):
+        """
+        Loads the fork-safe models among names (all registered by default) in a
+        server master process, so forked workers share their weights copy-on-write.
+        
+        """
+        self.warmup([name for name in names or list(self._loaders) if self._fork_safe.get(name)])
+
+    def status(self):
+        return {
+            name: {
+                "loaded": name in self._models,
+                "load_seconds": self._load_seconds.get(name),
+                "error": self._errors.get(name),
+            }
+            for name in self._loaders
+        }
+
+
+def warmup_names():
+    """Models listed in WARMUP_MODELS ("all" for every registered model)."""
+    names = [name.strip() for name in SETTINGS.warmup_models.split(",") if name.strip()]
+    if names == ["all"]:
+        return list(registry.status())
+    return names
+
+
+def _remote_or(name, loader):
+    """
+    With INFERENCE_WORKER_SOCKET set, the model is a proxy to the inference
+    worker (which loads it with loader); otherwise loader runs here.
+
+    """
+    def load():
+        if SETTINGS.inference_worker_socket:
+            from app.services import inference_worker
+            return inference_worker.remote(name, fallback_loader=loader)
+        return loader()
+    return load
+
+def _load_ocr():
+    import easyocr
+    return easyocr.Reader(['en'])
+
+def _load_whisper():
+    import whisper
+    return whisper.load_model(SETTINGS.whisper_model)
+
+def _load_embedding():
+    from app.services.cache import QueryEmbeddingCache, query_embedding_cache
+    # Query embeddings are cached in each API process, in front of the worker too
+    return QueryEmbeddingCache(_remote_or("embedding", _load_local_embedding)(), query_embedding_cache)
+
+def _load_local_embedding():
+    api_key = os.getenv("HUGGINGFACE_API_KEY")
+    if not api_key:
+        raise ValueError("HUGGINGFACE_API_KEY not found in environment variables")
+    os.environ["HUGGINGFACE_API_KEY"] = api_key
+    if SETTINGS.embedding_backend in ("onnx", "onnx-int8"):
+        from app.services.onnx_embeddings import OnnxEmbeddings
+        embedding = OnnxEmbeddings.load(SETTINGS.embedding_model, quantized=SETTINGS.embedding_backend == "onnx-int8")
+    else:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        if SETTINGS.embedding_threads:
+            import torch
+            torch.set_num_threads(SETTINGS.embedding_threads)
+        embedding = HuggingFaceEmbeddings(model_name=SETTINGS.embedding_model)
+    if SETTINGS.embedding_batching:
+        from app.services.embedding_batcher import BatchingEmbeddings
+        embedding = BatchingEmbeddings(
+            embedding,
+            max_batch_size=SETTINGS.embedding_batch_max_size,
+            max_wait_ms=SETTINGS.embedding_batch_max_wait_ms,
+        )
+    return embedding
+
+def _load_llm():
+    from langchain.chat_models import init_chat_model
+    if not os.getenv("GROQ_API_KEY"):
+        raise ValueError("GROQ_API_KEY not found in environment variables")
+    return init_chat_model(SETTINGS.llm_model, model_provider="groq", temperature=0.7)
+
+def _load_chroma_client():
+    # Chroma's persistent client does not support several processes on one directory,
+    # so the first process to open it owns it; others (a second server worker, the bulk
+    # ingestion CLI while the API runs) fail here instead of corrupting it
+    import chromadb
+    from app.core.processes import hold_exclusive
+    try:
+        hold_exclusive(os.path.join(SETTINGS.vector_store_dir, ".chroma.lock"))
+    except RuntimeError as e:
+        raise RuntimeError(f"Chroma store {SETTINGS.vector_store_dir} is in use: {str(e)}") from e
+    return chromadb.PersistentClient(path=SETTINGS.vector_store_dir)
+
+def _load_vector_backend():
+    if SETTINGS.vector_backend == "mmap":
+        from app.services.mmap_index import MmapBackend
+        return MmapBackend(os.path.join(SETTINGS.vector_store_dir, "mmap"))
+    from app.services.vector_backends import ChromaBackend
+    return ChromaBackend()
+
+def _load_tokenizer():
+    # Only a locally cached tokenizer is used: /ask must not depend on downloading one
+    from app.services.context_builder import CharTokenizer, HfTokenizer
+    try:
+        from transformers import AutoTokenizer
+        return HfTokenizer(AutoTokenizer.from_pretrained(SETTINGS.context_tokenizer, local_files_only=True))
+    except Exception as e:
+        logger.warning(f"Tokenizer '{SETTINGS.context_tokenizer}' not available locally ({str(e)}), counting 4 chars per token")
+        return CharTokenizer()
+
+
+registry = ModelRegistry()
+registry.register("ocr", _remote_or("ocr", _load_ocr))
+registry.register("whisper", _remote_or("whisper", _load_whisper))
+# onnxruntime starts its thread pool when a session is created
+registry.register("embedding", _load_embedding, fork_safe=SETTINGS.embedding_backend == "torch")
+registry.register("llm", _load_llm, fork_safe=False)
+registry.register("chroma_client", _load_chroma_client, fork_safe=False)
+registry.register("vector_backend", _load_vector_backend)
+registry.register("tokenizer", _load_tokenizer)
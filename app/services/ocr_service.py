@@ -1,9 +1,136 @@
-import easyocr
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image, ImageOps, ImageSequence
+from app.core.config import SETTINGS
+from app.services.model_registry import registry
 
-def ocr_path(img_path):
-    reader = easyocr.Reader(['en'])
-    results = reader.readtext(img_path)  
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=SETTINGS.ocr_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+def load_images(img_path):
+    """Every frame of an image file (multi-page TIFFs have several), upright and RGB."""
+    with Image.open(img_path) as image:
+        return [ImageOps.exif_transpose(frame.copy()).convert("RGB") for frame in ImageSequence.Iterator(image)]
+
+def normalize(image):
+    """Downscales oversized images so their longest side is at most OCR_MAX_SIDE."""
+    if max(image.size) > SETTINGS.ocr_max_side:
+        image = image.copy()
+        image.thumbnail((SETTINGS.ocr_max_side, SETTINGS.ocr_max_side), Image.LANCZOS)
+    return np.asarray(image)
+
+def tile(array, page):
+    """
+    Splits an image into overlapping tiles. Each tile carries its offset and a core
+    box; a region is kept only by the tile whose core contains its centre, so text
+    in the overlap is not reported twice.
+
+    """
+    height, width = array.shape[:2]
+    size, overlap = SETTINGS.ocr_tile_size, SETTINGS.ocr_tile_overlap
+    if height <= size and width <= size:
+        return [(page, 0, 0, (0, 0, width, height), array)]
+
+    step = size - overlap
+    tiles = []
+    for y in range(0, max(height - overlap, 1), step):
+        for x in range(0, max(width - overlap, 1), step):
+            x1, y1 = min(x + size, width), min(y + size, height)
+            core = (
+                x + overlap // 2 if x else 0,
+                y + overlap // 2 if y else 0,
+                x1 - overlap // 2 if x1 < width else width,
+                y1 - overlap // 2 if y1 < height else height,
+            )
+            tiles.append((page, x, y, core, array[y:y1, x:x1]))
+    return tiles
+
+def recognize_tiles(tiles):
+    """Detects and recognizes text in a batch of tiles; runs in-process or in a pool worker."""
+    reader = registry.get("ocr")
+    regions = []
+    for page, x, y, core, array in tiles:
+        for bbox, text, confidence in reader.readtext(array, batch_size=SETTINGS.ocr_recognition_batch_size):
+            xs = [point[0] + x for point in bbox]
+            ys = [point[1] + y for point in bbox]
+            cx, cy = (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+            if not (core[0] <= cx < core[2] and core[1] <= cy < core[3]):
+                continue
+            regions.append({
+                "page": page,
+                "text": text,
+                "confidence": round(float(confidence), 4),
+                "bbox": [int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))],
+            })
+    return regions
+
+def reading_order(regions):
+    """Sorts regions top-to-bottom into lines, then left-to-right within each line."""
+    ordered = []
+    for page in sorted({region["page"] for region in regions}):
+        page_regions = sorted((r for r in regions if r["page"] == page), key=lambda r: (r["bbox"][1] + r["bbox"][3]) / 2)
+        heights = sorted(r["bbox"][3] - r["bbox"][1] for r in page_regions)
+        tolerance = heights[len(heights) // 2] / 2 if heights else 0
+        lines, line_y = [], None
+        for region in page_regions:
+            cy = (region["bbox"][1] + region["bbox"][3]) / 2
+            if line_y is None or cy - line_y > tolerance:
+                lines.append([])
+                line_y = cy
+            lines[-1].append(region)
+        for line in lines:
+            ordered.extend(sorted(line, key=lambda r: r["bbox"][0]))
+    return ordered
+
+def ocr_images(images):
+    """
+    OCR pipeline for PIL images: normalize, tile, recognize tile batches (across
+    a process pool when OCR_WORKERS > 1) and return regions in reading order.
+
+    """
+    tiles = [t for page, image in enumerate(images) for t in tile(normalize(image), page)]
+    size = SETTINGS.ocr_tile_batch_size
+    batches = [tiles[i:i + size] for i in range(0, len(tiles), size)]
+
+    if SETTINGS.ocr_workers > 1 and len(batches) > 1:
+        regions = [r for batch in _get_pool().map(recognize_tiles, batches) for r in batch]
+    else:
+        regions = [r for batch in batches for r in recognize_tiles(batch)]
+
+    return [r for r in reading_order(regions) if r["confidence"] >= SETTINGS.ocr_min_confidence]
+
+def ocr_regions(img_path):
+    """Text regions of an image file with page, bbox and confidence, in reading order."""
+    return ocr_images(load_images(img_path))
+
+def ocr_pages(img_path):
+    """(page, text) sections of an image file; multi-page TIFFs give one per frame."""
+    images = load_images(img_path)
+    if SETTINGS.ocr_engine_mode == "simple":
+        return [(page if len(images) > 1 else None, _ocr_simple(np.asarray(image))) for page, image in enumerate(images)]
+
+    regions = ocr_images(images)
+    if len(images) == 1:
+        return [(None, " ".join(r["text"] for r in regions))]
+    return [(page, " ".join(r["text"] for r in regions if r["page"] == page)) for page in range(len(images))]
+
+def _ocr_simple(image):
+    reader = registry.get("ocr")
+    results = reader.readtext(image)
     text_list = [texts_extracting[1] for texts_extracting in results]
-    final_text = " ".join(text_list)
-    
-    return final_text
\ No newline at end of file
+    return " ".join(text_list)
+
+def ocr_path(img_path):
+    return "\n".join(text for _, text in ocr_pages(img_path))
\ No newline at end of file
@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.core.config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = "embedding_config.json"
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+
+
+def model_dir(model_name):
+    return os.path.join(SETTINGS.embedding_onnx_dir, model_name.replace("/", "__"))
+
+
+def export(model_name, output_dir):
+    """
+    Exports a sentence-transformers model to ONNX (plus a dynamically int8-quantized
+    copy) with its fast tokenizer and pooling settings. Needs torch; serving does not.
+
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    staging = tempfile.mkdtemp(prefix="onnx_export_", dir=os.path.dirname(output_dir) or None)
+    try:
+        sample = model.tokenizer(["export sample"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            os.path.join(staging, MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dict(axes, last_hidden_state={0: "batch", 1: "sequence"}),
+            opset_version=17,
+        )
+        quantize_dynamic(
+            os.path.join(staging, MODEL_FILE), os.path.join(staging, QUANTIZED_MODEL_FILE), weight_type=QuantType.QInt8
+        )
+        model.tokenizer.save_pretrained(staging)
+        module_types = [type(module).__name__ for module in model]
+        with open(os.path.join(staging, CONFIG_FILE), "w") as f:
+            json.dump({
+                "model_name": model_name,
+                "max_seq_length": model.max_seq_length,
+                "normalize": "Normalize" in module_types,
+                "input_names": input_names,
+            }, f)
+        # Another worker may have finished first: keep whichever copy landed
+        if not os.path.exists(output_dir):
+            os.replace(staging, output_dir)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return output_dir
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Mean-pooled sentence embeddings from an ONNX export of a sentence-transformers
+    model, run with onnxruntime on CPU. Matches the PyTorch model's pooling and
+    normalization, so vectors stay comparable with ones it already stored.
+
+    """
+
+    def __init__(self, directory, quantized=False, threads=0, batch_size=32):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(directory, CONFIG_FILE)) as f:
+            self.config = json.load(f)
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.config["max_seq_length"])
+        self.tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(directory, QUANTIZED_MODEL_FILE if quantized else MODEL_FILE),
+            options, providers=["CPUExecutionProvider"],
+        )
+        self.batch_size = batch_size
+
+    @classmethod
+    def load(cls, model_name, quantized=False):
+        directory = model_dir(model_name)
+        if not os.path.exists(os.path.join(directory, CONFIG_FILE)):
+            logger.info(f"Exporting {model_name} to ONNX in {directory}")
+            os.makedirs(os.path.dirname(directory), exist_ok=True)
+            export(model_name, directory)
+        return cls(
+            directory, quantized=quantized,
+            threads=SETTINGS.embedding_threads, batch_size=SETTINGS.embedding_onnx_batch_size,
+        )
+
+    def _embed(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: inputs[name] for name in self.config["input_names"]})[0]
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config["normalize"]:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.tolist()
+
+    def embed_documents(self, texts):
+        # Sort by length so each batch pads to similar lengths, then restore the order
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._embed([texts[i] for i in batch])):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text):
+        return self._embed([text])[0]
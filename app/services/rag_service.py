@@ -1,96 +1,144 @@
-from langchain.chat_models import init_chat_model
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.prompts import ChatPromptTemplate
-from dotenv import load_dotenv
-import os
-
-# Load and validate environment variables
-load_dotenv()
-
-#llm api key
-groq_api_key = os.getenv("GROQ_API_KEY")
-if not groq_api_key:
-    raise ValueError("GROQ_API_KEY not found in environment variables")
-
-#embedding model api key
-hf_api_key = os.getenv("HUGGINGFACE_API_KEY")
-if not hf_api_key:
-    raise ValueError("HUGGINGFACE_API_KEY not found in environment variables")
-
-#LLM
-model = init_chat_model("llama-3.3-70b-versatile", model_provider="groq",temperature = 0.7)
-
-#embedding model
-embedding = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-# Load vector store
-persist_directory = r"C:\Users\panka\Desktop\document_ai_hub\data\vector_store"
-if not os.path.exists(persist_directory):
-    raise FileNotFoundError(f"Vector store directory not found: {persist_directory}")
-vector_store = Chroma(persist_directory=persist_directory, embedding_function=embedding)
- 
-
-def query_retriever(query):
+from app.services.model_registry import registry
+from app.services import vector_store
+from app.services.cache import answer_cache
+from app.services.context_builder import build_context
+from app.core.config import SETTINGS
+from app.core import metrics
+
+
+def query_retriever(query, owner_id, role, document_id=None):
     
     """
-    Retrieves top k relevant documents from the vector store based on the query.
+    Retrieves the candidate chunks for a query from the caller's partition of the
+    vector store, optionally restricted to a single document.
     
     """
-    retriever = vector_store.as_retriever(search_type = "similarity",search_kwargs={"k": 3})
+    return vector_store.search(query, owner_id, role, k=SETTINGS.context_candidates, document_id=document_id)
+
+
+def retrieve_context(query, owner_id, role, document_id=None):
+    """
+    Retrieves candidates and packs them into the role's context budget.
     
-    return retriever.invoke(query)
+    """
+    retrieved_docs, tokens = build_context(query_retriever(query, owner_id, role, document_id), role)
+    metrics.PROMPT_TOKENS.labels(role).observe(tokens)
+    return retrieved_docs
 
 
+ROLE_PROMPTS = {
+    "lawyer": (
+        "You are an expert lawyer. Based only on the provided reference material and your legal expertise, "
+        "extract key legal clauses, summarize contract terms, and provide a concise legal analysis relevant to the query. "
+        "Do not provide advice or information outside the legal domain (e.g., banking or business management). "
+        "If the query or reference material is unrelated to law, state that you cannot assist.\n\n"
+        "Reference:\n{context}\n\n"
+        "Query: {query}\n\n"
+        "Ensure your response is only  relevant to provided context and role-based ,if it is not available in context,just say i don't know,please ask query only related to law."
+    ),
+    "banker": (
+        "You are a knowledgeable banker. Based exclusively on the provided reference material and your banking expertise, "
+        "answer the query related to bank policies, loans, credit cards, or financial services. Provide practical advice or explanations. "
+        "Do not provide advice or information outside the banking domain (e.g., legal clauses,enterprises and academic summaries). "
+        "If the query or reference material is unrelated to banking, state that you cannot assist.\n\n"
+        "Reference:\n{context}\n\n"
+        "Query: {query}\n\n"
+        "Ensure your response is only  relevant to provided context and role-based,if it is not available in context,just say i don't know.Please ask query related to banking only."
+    ),
+    "student": (
+        "You are a  student assistant. Based solely on the provided reference material and your academic skills, "
+        "summarize it as if it were a research paper, highlight key points, and generate appropriate citations if applicable. "
+        "Tailor the summary to the query and avoid non-academic content (e.g., legal,banking,enterprises). "
+        "If the query or reference material is unrelated to academic summarization, state that you cannot assist.\n\n"
+        "Reference:\n{context}\n\n"
+        "Query: {query}\n\n"
+        "Ensure your response is only  relevant to provided context and role-based,if it is not available in context,just say i don't know.please ask query related to academics and research only."
+    ),
+    "enterprise": (
+        "You are an expert enterprise assistant. Base  on the provided reference material and your business expertise, "
+        "transcribe or interpret it as if it were meeting notes, extract actionable items or key decisions, and address the query with a business focus. "
+        "Tailor the summary to the query and avoid non-bussiness content (e.g., legal,banking,academics). "
+        "Reference:\n{context}\n\n"
+        "Query: {query}\n\n"
+        "Ensure your response is only  relevant to provided context and role-based,if it is not available in context,just say i don't know the answer,please ask query related to bussiness."
+    ),
+}
 
-def role_based_response(query,role):
+
+def build_prompt(query, role, retrieved_docs):
     """
-    Generates a role-specific response to a query using retrieved context and an LLM.
+    Builds the role-specific prompt from the query and retrieved context.
     
     """
-    retrieved_docs = query_retriever(query) 
-    retrieved_text = "\n".join([doc.page_content for doc in retrieved_docs])
-    
-    role_based_promt = {
-        "lawyer": (
-            "You are an expert lawyer. Based only on the provided reference material and your legal expertise, "
-            "extract key legal clauses, summarize contract terms, and provide a concise legal analysis relevant to the query. "
-            "Do not provide advice or information outside the legal domain (e.g., banking or business management). "
-            "If the query or reference material is unrelated to law, state that you cannot assist.\n\n"
-            f"Reference:\n{retrieved_text}\n\n"
-            f"Query: {query}\n\n"
-            "Ensure your response is only  relevant to provided context and role-based ,if it is not available in context,just say i don't know,please ask query only related to law."
-        ),
-        "banker": (
-            "You are a knowledgeable banker. Based exclusively on the provided reference material and your banking expertise, "
-            "answer the query related to bank policies, loans, credit cards, or financial services. Provide practical advice or explanations. "
-            "Do not provide advice or information outside the banking domain (e.g., legal clauses,enterprises and academic summaries). "
-            "If the query or reference material is unrelated to banking, state that you cannot assist.\n\n"
-            f"Reference:\n{retrieved_text}\n\n"
-            f"Query: {query}\n\n"
-            "Ensure your response is only  relevant to provided context and role-based,if it is not available in context,just say i don't know.Please ask query related to banking only."
-        ),
-        "student": (
-            "You are a  student assistant. Based solely on the provided reference material and your academic skills, "
-            "summarize it as if it were a research paper, highlight key points, and generate appropriate citations if applicable. "
-            "Tailor the summary to the query and avoid non-academic content (e.g., legal,banking,enterprises). "
-            "If the query or reference material is unrelated to academic summarization, state that you cannot assist.\n\n"
-            f"Reference:\n{retrieved_text}\n\n"
-            f"Query: {query}\n\n"
-            "Ensure your response is only  relevant to provided context and role-based,if it is not available in context,just say i don't know.please ask query related to academics and research only."
-        ),
-        "enterprise": (
-            "You are an expert enterprise assistant. Base  on the provided reference material and your business expertise, "
-            "transcribe or interpret it as if it were meeting notes, extract actionable items or key decisions, and address the query with a business focus. "
-            "Tailor the summary to the query and avoid non-bussiness content (e.g., legal,banking,academics). "
-            f"Reference:\n{retrieved_text}\n\n"
-            f"Query: {query}\n\n"
-            "Ensure your response is only  relevant to provided context and role-based,if it is not available in context,just say i don't know the answer,please ask query related to bussiness."
-        )
- }
+    context = "\n\n".join(doc.page_content for doc in retrieved_docs)
+    return ROLE_PROMPTS[role].format(context=context, query=query)
+
+
+def context_chunk_ids(retrieved_docs):
+    return [chunk_id for doc in retrieved_docs for chunk_id in doc.metadata.get("chunk_ids", [doc.metadata.get("chunk_id")])]
+
+
+
+def sources(retrieved_docs):
+    """Source chunks returned alongside an answer."""
+    return [
+        {
+            "chunk_id": doc.metadata.get("chunk_id"),
+            "document_id": doc.metadata.get("document_id"),
+            "content": doc.page_content,
+        }
+        for doc in retrieved_docs
+    ]
+
+
+def role_based_answer(query, role, owner_id, document_id=None):
+    """
+    Generates a role-specific answer and returns it with its source chunks.
     
+    """
+    retrieved_docs = retrieve_context(query, owner_id, role, document_id)
+    chunk_ids = context_chunk_ids(retrieved_docs)
+
+    # Identical questions over the same chunks reuse the previous answer
+    cache_key = answer_cache.key(vector_store.collection_name(owner_id, role), owner_id, role, query, chunk_ids)
+    answer = answer_cache.get(cache_key)
+    if answer is None:
+        promt = build_prompt(query, role, retrieved_docs)
+        with metrics.observe_stage("llm", role=role):
+            answer = registry.get("llm").invoke(promt).content
+        answer_cache.set(cache_key, answer)
+    return {"generated_answer": answer, "sources": sources(retrieved_docs)}
+
+
+def role_based_response(query,role,owner_id,document_id=None):
+    """
+    Generates a role-specific response to a query using retrieved context and an LLM.
     
+    """
+    return role_based_answer(query, role, owner_id, document_id)["generated_answer"]
+
+
+def stream_role_based_response(query, role, owner_id, document_id=None):
+    """
+    Streaming variant of role_based_response. Yields ("token", text) events as the
+    LLM produces them, then a final ("sources", [...]) event with the retrieved chunks.
     
-    promt = role_based_promt[role]
-    response = model.invoke(promt)
-    return response.content
+    """
+    retrieved_docs = retrieve_context(query, owner_id, role, document_id)
+    chunk_ids = context_chunk_ids(retrieved_docs)
+
+    cache_key = answer_cache.key(vector_store.collection_name(owner_id, role), owner_id, role, query, chunk_ids)
+    cached_answer = answer_cache.get(cache_key)
+    if cached_answer is not None:
+        yield "token", cached_answer
+    else:
+        promt = build_prompt(query, role, retrieved_docs)
+        parts = []
+        llm_stream = metrics.timed_iter(registry.get("llm").stream(promt), "llm", role=role)
+        for chunk in llm_stream:
+            if chunk.content:
+                parts.append(chunk.content)
+                yield "token", chunk.content
+        answer_cache.set(cache_key, "".join(parts))
+
+    yield "sources", sources(retrieved_docs)
@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class ThreadConnections:
+    """
+    Reusable SQLite connections: one per thread and database file, the most
+    recently used max_per_thread kept open. The schema runs once per file, not on
+    every connect. A file that was deleted or replaced (a dropped collection) is
+    noticed by its inode and reopened. Callers must not close the connections.
+
+    """
+
+    def __init__(self, schema, max_per_thread=16):
+        self.schema = schema
+        self.max_per_thread = max_per_thread
+        self._local = threading.local()
+        self._ready = set()  # (path, inode) of files the schema ran on
+        self._lock = threading.Lock()
+
+    def _cache(self):
+        # Connections do not survive a fork
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.pid = os.getpid()
+            self._local.connections = OrderedDict()
+        return self._local.connections
+
+    def get(self, path):
+        connections = self._cache()
+        try:
+            inode = os.stat(path).st_ino
+        except FileNotFoundError:
+            inode = None
+        cached = connections.get(path)
+        if cached is not None:
+            if cached[0] == inode:
+                connections.move_to_end(path)
+                return cached[1]
+            del connections[path]
+            cached[1].close()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        inode = os.stat(path).st_ino
+        with self._lock:
+            ready = (path, inode) in self._ready
+        if not ready:
+            conn.executescript(self.schema)
+            with self._lock:
+                self._ready.add((path, inode))
+        connections[path] = (inode, conn)
+        while len(connections) > self.max_per_thread:
+            _, (_, oldest) = connections.popitem(last=False)
+            oldest.close()
+        return conn
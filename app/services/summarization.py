@@ -1,9 +1,59 @@
-from langchain_community.document_loaders import PyPDFLoader
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+from app.core.config import SETTINGS
 
-def extract_pdf_text(pdf_path):
-    extract_text = PyPDFLoader(pdf_path)
-    extraction=extract_text.load()
-    extracted_text = "\n".join([page.page_content for page in extraction])
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    # Spawned (not forked) workers: the API process runs threads that must not be copied
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=SETTINGS.pdf_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+def _extract_page_range(pdf_path, start, stop):
+    """Text layer of pages [start, stop); runs in a worker process."""
+    reader = PdfReader(pdf_path)
+    return [(number, reader.pages[number].extract_text() or "") for number in range(start, stop)]
+
+def ocr_pdf_page(pdf_path, page_number):
+    """OCR of the images embedded in a page without a text layer (scanned pages)."""
+    from app.services.ocr_service import ocr_images
+    page = PdfReader(pdf_path).pages[page_number]
+    images = [image.image for image in page.images]
+    if not images:
+        return ""
+    return " ".join(region["text"] for region in ocr_images(images))
+
+def iter_pdf_pages(pdf_path):
+    """
+    Yields (page_number, text) in page order. Page ranges are extracted in parallel
+    worker processes; pages with no usable text layer are routed to OCR.
     
-    return extracted_text
+    """
+    page_count = len(PdfReader(pdf_path).pages)
+    step = SETTINGS.pdf_pages_per_task
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+    if SETTINGS.pdf_workers > 1 and len(ranges) > 1:
+        pool = _get_pool()
+        futures = [pool.submit(_extract_page_range, pdf_path, start, stop) for start, stop in ranges]
+        results = (future.result() for future in futures)
+    else:
+        results = (_extract_page_range(pdf_path, start, stop) for start, stop in ranges)
 
+    for pages in results:
+        for number, text in pages:
+            if len(text.strip()) < SETTINGS.pdf_min_text_chars:
+                text = ocr_pdf_page(pdf_path, number) or text
+            yield number, text
+
+def extract_pdf_text(pdf_path):
+    return "\n".join(text for _, text in iter_pdf_pages(pdf_path))
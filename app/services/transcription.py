@@ -1,17 +1,105 @@
-import whisper
 import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from app.core.config import SETTINGS
+from app.services.model_registry import registry
 
-model = whisper.load_model("base")
+SAMPLE_RATE = 16000  # whisper.load_audio resamples to 16 kHz mono
+FRAME_SECONDS = 0.1
 
-def transcribe_audio(audio_file_path):
-    """Transcribes an audio file to text"""
-    
+# Whisper installs decoding hooks on the shared model, so calls are serialized
+_transcribe_lock = threading.Lock()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=SETTINGS.transcription_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+def split_at_silences(audio):
+    """
+    Returns (start, end) sample bounds of segments of roughly
+    TRANSCRIPTION_SEGMENT_SECONDS, cut at the quietest frame near each target
+    boundary (never longer than 1.5x the target).
+
+    """
+    frame = int(SAMPLE_RATE * FRAME_SECONDS)
+    frame_count = len(audio) // frame
+    if frame_count == 0:
+        return [(0, len(audio))]
+    frames = audio[:frame_count * frame].reshape(frame_count, frame)
+    energy_db = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+
+    target = int(SETTINGS.transcription_segment_seconds / FRAME_SECONDS)
+    bounds, start = [], 0
+    while frame_count - start > target * 1.5:
+        window_start, window_end = start + target // 2, start + int(target * 1.5)
+        quietest = window_start + int(np.argmin(energy_db[window_start:window_end]))
+        bounds.append((start * frame, quietest * frame))
+        start = quietest
+    bounds.append((start * frame, len(audio)))
+    return bounds
+
+def transcribe_segment(audio, offset):
+    """Transcribes one segment; timestamps are shifted by the segment offset (seconds)."""
+    model = registry.get("whisper")
+    with _transcribe_lock:
+        result = model.transcribe(audio, fp16=False)
+    return {
+        "start": offset,
+        "end": offset + len(audio) / SAMPLE_RATE,
+        "text": result["text"].strip(),
+        "segments": [
+            {"start": offset + s["start"], "end": offset + s["end"], "text": s["text"].strip()}
+            for s in result.get("segments", [])
+        ],
+    }
+
+def iter_transcript_segments(audio_file_path):
+    """
+    Yields transcribed segments in order as they complete. Segments are cut at
+    silences and transcribed in parallel worker processes when
+    TRANSCRIPTION_WORKERS > 1.
+
+    """
     if not os.path.exists(audio_file_path):
         raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
-    
+
+    import whisper
+    try:
+        audio = whisper.load_audio(audio_file_path)
+    except Exception as e:
+        raise ValueError(f"Transcription failed: {str(e)}")
+
+    bounds = split_at_silences(audio)
+    jobs = [(audio[start:end], start / SAMPLE_RATE) for start, end in bounds]
+
+    if SETTINGS.transcription_workers > 1 and len(jobs) > 1:
+        pool = _get_pool()
+        results = (future.result() for future in [pool.submit(transcribe_segment, *job) for job in jobs])
+    else:
+        results = (transcribe_segment(*job) for job in jobs)
+
     try:
-        result = model.transcribe(audio_file_path)
-        return result['text']
+        for segment in results:
+            yield segment
     except Exception as e:
         raise ValueError(f"Transcription failed: {str(e)}")
 
+def transcript_sections(audio_file_path):
+    """(metadata, text) sections for the embedder, one per transcribed segment."""
+    for segment in iter_transcript_segments(audio_file_path):
+        yield {"start_seconds": round(segment["start"], 2), "end_seconds": round(segment["end"], 2)}, segment["text"]
+
+def transcribe_audio(audio_file_path):
+    """Transcribes an audio file to text"""
+    return " ".join(segment["text"] for segment in iter_transcript_segments(audio_file_path))
@@ -0,0 +1,200 @@
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+from contextlib import closing
+from langchain_core.documents import Document
+from app.core.config import SETTINGS
+
+
+class VectorBackend:
+    """
+    Storage and nearest-neighbour search for embedded chunks, by collection name.
+    Filters (where) are equality matches on chunk metadata, e.g. {"owner_id": 1}.
+    search returns (Document, distance) pairs, nearest first.
+
+    """
+
+    def add(self, name, ids, texts, metadatas, embeddings):
+        raise NotImplementedError
+
+    def delete(self, name, ids):
+        raise NotImplementedError
+
+    def search(self, name, embedding, k, where=None):
+        raise NotImplementedError
+
+    def count(self, name):
+        raise NotImplementedError
+
+    def collections(self):
+        raise NotImplementedError
+
+    def drop(self, name):
+        raise NotImplementedError
+
+    def compact(self, name):
+        """Rebuilds a collection from its live vectors. Returns the number kept."""
+        raise NotImplementedError
+
+
+def chroma_where(where):
+    if not where:
+        return None
+    clauses = [{key: value} for key, value in where.items()]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def is_uuid(name):
+    try:
+        uuid.UUID(name)
+    except ValueError:
+        return False
+    return True
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, file)) for root, _, files in os.walk(path) for file in files
+    )
+
+
+def database_size(path):
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+
+class ChromaBackend(VectorBackend):
+    """
+    Chroma (HNSW) collections in a persistent client, which one process owns (see
+    model_registry._load_chroma_client). Callers hold vector_store.write_lock around
+    writes, compaction and drops.
+
+    """
+
+    def __init__(self, client=None, directory=None):
+        self._client = client
+        self.directory = directory or SETTINGS.vector_store_dir
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def client(self):
+        if self._client is None:
+            from app.services.model_registry import registry
+            self._client = registry.get("chroma_client")
+        return self._client
+
+    def reclaim(self):
+        """
+        Frees the disk space of deleted collections, which chromadb 0.6 keeps: their
+        HNSW segment directories stay behind and chroma.sqlite3 never shrinks. Returns
+        the number of bytes freed.
+
+        """
+        database = os.path.join(self.directory, "chroma.sqlite3")
+        if not os.path.exists(database):
+            return 0
+        # Directories are listed before the live segments are read, so a segment
+        # created in between is never mistaken for an orphan
+        directories = [entry for entry in os.scandir(self.directory) if entry.is_dir() and is_uuid(entry.name)]
+        with closing(sqlite3.connect(database, timeout=30, isolation_level=None)) as conn:
+            live = {row[0] for row in conn.execute("SELECT id FROM segments")}
+        freed = 0
+        for entry in directories:
+            if entry.name not in live:
+                freed += directory_size(entry.path)
+                shutil.rmtree(entry.path, ignore_errors=True)
+        before = database_size(database)
+        with closing(sqlite3.connect(database, timeout=30, isolation_level=None)) as conn:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return freed + max(before - database_size(database), 0)
+
+    def collection(self, name, create=True):
+        """The collection's handle, or None when it does not exist and create is False."""
+        collection = self._collections.get(name)
+        if collection is not None:
+            return collection
+        with self._lock:
+            client = self.client()
+            if create:
+                collection = client.get_or_create_collection(name, embedding_function=None)
+            elif name in client.list_collections():
+                collection = client.get_collection(name, embedding_function=None)
+            else:
+                return None
+            self._collections[name] = collection
+        return collection
+
+    def add(self, name, ids, texts, metadatas, embeddings):
+        self.collection(name).upsert(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
+
+    def delete(self, name, ids):
+        collection = self.collection(name, create=False)
+        if collection is not None:
+            collection.delete(ids=list(ids))
+
+    def _query(self, name, embedding, k, where):
+        # Reads never create a collection, so they cannot recreate one mid-compaction
+        collection = self.collection(name, create=False)
+        if collection is None:
+            return None
+        return collection.query(
+            query_embeddings=[embedding], n_results=k, where=chroma_where(where),
+            include=["documents", "metadatas", "distances"],
+        )
+
+    def search(self, name, embedding, k, where=None):
+        try:
+            result = self._query(name, embedding, k, where)
+        except Exception:
+            # Replaced by a compaction while the handle was held; resolve it again
+            self._collections.pop(name, None)
+            result = self._query(name, embedding, k, where)
+        if result is None:
+            return []
+        return [
+            (Document(page_content=text, metadata=metadata), distance)
+            for text, metadata, distance in zip(result["documents"][0], result["metadatas"][0], result["distances"][0])
+        ]
+
+    def count(self, name):
+        collection = self.collection(name, create=False)
+        return collection.count() if collection is not None else 0
+
+    def collections(self):
+        return [name for name in self.client().list_collections() if not name.endswith("__compact")]
+
+    def drop(self, name):
+        with self._lock:
+            self._collections.pop(name, None)
+            if name in self.client().list_collections():
+                self.client().delete_collection(name)
+                self.reclaim()
+
+    def compact(self, name, batch_size=1000):
+        # Copy into a staging collection, then swap it in under the original name
+        client = self.client()
+        source = client.get_collection(name)
+        staging = f"{name}__compact"
+        if staging in client.list_collections():
+            client.delete_collection(staging)
+        target = client.create_collection(staging, metadata=source.metadata, embedding_function=None)
+
+        copied = 0
+        while True:
+            page = source.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=copied)
+            if not len(page["ids"]):
+                break
+            target.add(
+                ids=page["ids"], embeddings=page["embeddings"],
+                documents=page["documents"], metadatas=page["metadatas"],
+            )
+            copied += len(page["ids"])
+
+        with self._lock:
+            self._collections.pop(name, None)
+            client.delete_collection(name)
+            target.modify(name=name)
+            self.reclaim()
+        return copied
@@ -0,0 +1,148 @@
+import threading
+from app.core.config import SETTINGS
+from app.core import metrics
+from app.services import lexical_index
+from app.services.model_registry import registry
+
+_lock = threading.Lock()
+_write_locks = {}
+
+
+def collection_name(owner_id, base_role):
+    """
+    Name of the partition holding a user's chunks: one collection per owner,
+    or one per base role when VECTOR_PARTITION=role.
+
+    """
+    if SETTINGS.vector_partition == "role":
+        return f"role_{base_role}"
+    return f"tenant_{owner_id}"
+
+
+def backend():
+    """The configured VectorBackend (VECTOR_BACKEND=chroma or mmap)."""
+    return registry.get("vector_backend")
+
+
+def write_lock(name):
+    """Serializes writes to a collection with its compaction."""
+    with _lock:
+        return _write_locks.setdefault(name, threading.Lock())
+
+
+def search_filter(owner_id, document_id=None):
+    if document_id is None:
+        return {"owner_id": owner_id}
+    return {"owner_id": owner_id, "document_id": document_id}
+
+
+def add_chunks(chunks, ids, owner_id, base_role, document_id, embeddings=None):
+    """
+    Tags chunks with owner, document and role and writes them to the owner's partition
+    and its lexical index. Precomputed embeddings, if given, are written as-is instead
+    of re-embedding the chunks.
+
+    """
+    for chunk_id, chunk in zip(ids, chunks):
+        chunk.metadata.update({
+            "chunk_id": chunk_id,
+            "owner_id": owner_id,
+            "document_id": document_id,
+            "base_role": base_role,
+        })
+    texts = [chunk.page_content for chunk in chunks]
+    if embeddings is None:
+        embeddings = registry.get("embedding").embed_documents(texts)
+    name = collection_name(owner_id, base_role)
+    with write_lock(name):
+        backend().add(name, ids, texts, [chunk.metadata for chunk in chunks], embeddings)
+        lexical_index.add(name, chunks, ids)
+    return ids
+
+
+def delete_chunks(owner_id, base_role, ids):
+    """Removes chunks from the owner's partition and its lexical index. Returns the collection name."""
+    name = collection_name(owner_id, base_role)
+    if ids:
+        with write_lock(name):
+            backend().delete(name, list(ids))
+            lexical_index.delete(name, list(ids))
+    return name
+
+
+def drop_collection(name):
+    """Deletes a whole collection (e.g. a removed tenant's partition)."""
+    with write_lock(name):
+        backend().drop(name)
+        lexical_index.drop(name)
+
+
+def collection_names():
+    return backend().collections()
+
+
+def count(name):
+    return backend().count(name)
+
+
+def compact(name):
+    """
+    Rebuilds a collection from its live vectors so the index and its files
+    shrink back to the live data. Writes to the collection wait until it is done.
+
+    """
+    with write_lock(name):
+        return backend().compact(name)
+
+
+def normalized(scored):
+    """Min-max normalizes (doc, score) pairs to 0..1, keyed by chunk id."""
+    if not scored:
+        return {}
+    low = min(score for _, score in scored)
+    high = max(score for _, score in scored)
+    span = (high - low) or 1.0
+    return {doc.metadata["chunk_id"]: (doc, (score - low) / span) for doc, score in scored}
+
+
+def fuse(lexical, dense, k):
+    """Weighted sum of normalized BM25 and vector scores."""
+    weight = SETTINGS.hybrid_vector_weight
+    lexical = normalized(lexical)
+    # Backends return distances: negate so that higher is better
+    dense = normalized([(doc, -distance) for doc, distance in dense])
+    fused = []
+    for chunk_id in lexical.keys() | dense.keys():
+        doc = (dense.get(chunk_id) or lexical.get(chunk_id))[0]
+        score = weight * dense.get(chunk_id, (None, 0.0))[1] + (1 - weight) * lexical.get(chunk_id, (None, 0.0))[1]
+        fused.append((score, doc))
+    fused.sort(key=lambda pair: pair[0], reverse=True)
+    return [doc for _, doc in fused[:k]]
+
+
+def search(query, owner_id, base_role, k=3, document_id=None):
+    """
+    Retrieval restricted to the caller's partition (and optionally one document),
+    by vector similarity, BM25, or a fusion of both depending on RETRIEVAL_MODE.
+    In hybrid mode, queries whose exact-match terms (clause numbers, codes, tickers)
+    are all found by BM25 are answered lexically, without an embedding call.
+
+    """
+    name = collection_name(owner_id, base_role)
+    mode = SETTINGS.retrieval_mode
+    candidates = max(k, SETTINGS.hybrid_candidates)
+
+    if mode in ("hybrid", "lexical"):
+        with metrics.observe_stage("lexical_search", role=base_role):
+            lexical = lexical_index.search(name, query, owner_id, k=candidates, document_id=document_id)
+        if mode == "lexical" or (SETTINGS.lexical_fast_path and lexical_index.is_confident(query, lexical)):
+            return [doc for doc, _ in lexical[:k]]
+
+    with metrics.observe_stage("vector_search", role=base_role):
+        embedding = registry.get("embedding").embed_query(query)
+        dense = backend().search(
+            name, embedding, k=candidates if mode == "hybrid" else k, where=search_filter(owner_id, document_id)
+        )
+    if mode != "hybrid":
+        return [doc for doc, _ in dense]
+    return fuse(lexical, dense, k)
@@ -0,0 +1,136 @@
+"""
+Parity and speed check of the ONNX embedding backends against PyTorch.
+
+Embeds the same texts with HuggingFaceEmbeddings (torch), the ONNX export and its
+int8-quantized copy, then reports per-text cosine similarity to the torch vectors,
+the largest change in query/document similarity scores, and throughput:
+
+    python -m benchmarks.embedding_parity
+    python -m benchmarks.embedding_parity --threads 4 --min-cosine 0.99
+
+Texts are chunks of the sample PDFs in data/uploaded_documents (plus a few
+fixed sentences). Exits non-zero if a backend falls outside the tolerance, in
+which case vectors it produces are not interchangeable with the stored ones.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.pipeline import DEFAULT_FILES, DEFAULT_OUTPUT_DIR, QUERIES, git_commit, peak_rss_mb  # sets offline env defaults
+
+import numpy as np  # noqa: E402
+from app.core.config import SETTINGS  # noqa: E402
+
+SENTENCES = [
+    "The lessee shall pay the rent on the first day of each month.",
+    "Interest on the loan accrues daily at a fixed annual rate of 7.5%.",
+    "Attention allows the model to weigh every token of the input sequence.",
+    "Action item: finance to circulate the revised budget before Friday.",
+]
+
+
+def sample_texts(files_dir, limit):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from app.services.summarization import iter_pdf_pages
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=60)
+    texts = list(SENTENCES)
+    for path in sorted(Path(files_dir).glob("*.pdf")):
+        for _, text in iter_pdf_pages(str(path)):
+            texts.extend(chunk.page_content for chunk in splitter.create_documents([text or ""]))
+            if len(texts) >= limit:
+                return texts[:limit]
+    return texts
+
+
+def timed_embed(embedding, texts, repeats):
+    embedding.embed_documents(texts[:8])  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        vectors = np.array(embedding.embed_documents(texts), dtype=np.float32)
+    seconds = (time.perf_counter() - start) / repeats
+    query_start = time.perf_counter()
+    for query in QUERIES:
+        embedding.embed_query(query)
+    query_ms = (time.perf_counter() - query_start) / len(QUERIES) * 1000
+    return vectors, seconds, query_ms
+
+
+def unit(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", default=str(DEFAULT_FILES))
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=SETTINGS.embedding_threads)
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Minimum cosine to the torch vector, per text")
+    parser.add_argument("--max-score-delta", type=float, default=0.03, help="Maximum change of any query/text similarity")
+    parser.add_argument("--output", help="Results file (default bench_results/embedding-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from app.services.onnx_embeddings import OnnxEmbeddings
+    import torch
+
+    SETTINGS.embedding_threads = args.threads
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    texts = sample_texts(args.files, args.texts)
+    backends = {
+        "torch": HuggingFaceEmbeddings(model_name=SETTINGS.embedding_model),
+        "onnx": OnnxEmbeddings.load(SETTINGS.embedding_model),
+        "onnx-int8": OnnxEmbeddings.load(SETTINGS.embedding_model, quantized=True),
+    }
+
+    results = {"commit": git_commit(), "model": SETTINGS.embedding_model, "texts": len(texts), "threads": args.threads, "backends": {}}
+    reference = reference_queries = None
+    failed = False
+    for name, embedding in backends.items():
+        vectors, seconds, query_ms = timed_embed(embedding, texts, args.repeats)
+        queries = np.array([embedding.embed_query(query) for query in QUERIES], dtype=np.float32)
+        entry = {
+            "texts_per_second": round(len(texts) / seconds, 2),
+            "speedup": None,
+            "query_ms": round(query_ms, 3),
+        }
+        if reference is None:
+            reference, reference_queries = vectors, queries
+            entry["speedup"] = 1.0
+        else:
+            cosine = np.sum(unit(vectors) * unit(reference), axis=1)
+            scores = unit(queries) @ unit(vectors).T
+            reference_scores = unit(reference_queries) @ unit(reference).T
+            top = lambda s: np.argsort(-s, axis=1)[:, :3]
+            entry.update({
+                "speedup": round(results["backends"]["torch"]["seconds"] / seconds, 2),
+                "cosine_min": round(float(cosine.min()), 5),
+                "cosine_mean": round(float(cosine.mean()), 5),
+                "max_score_delta": round(float(np.abs(scores - reference_scores).max()), 5),
+                "top3_agreement": round(float(np.mean([
+                    len(set(a) & set(b)) / 3 for a, b in zip(top(scores), top(reference_scores))
+                ])), 4),
+            })
+            entry["within_tolerance"] = (
+                entry["cosine_min"] >= args.min_cosine and entry["max_score_delta"] <= args.max_score_delta
+            )
+            failed = failed or not entry["within_tolerance"]
+        entry["seconds"] = round(seconds, 4)
+        results["backends"][name] = entry
+        print(name, json.dumps(entry), flush=True)
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"embedding-{results['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
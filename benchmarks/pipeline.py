@@ -0,0 +1,244 @@
+"""
+Offline benchmark of the ingestion and retrieval pipeline.
+
+Runs extraction, chunking, embedding, indexing and retrieval over the sample
+files in data/uploaded_documents with a stub LLM in place of Groq, and writes
+machine-readable results that can be compared across commits:
+
+    python -m benchmarks.pipeline
+    python -m benchmarks.pipeline --skip-audio --output bench_results/head.json
+    python -m benchmarks.pipeline --compare bench_results/<old-commit>.json
+
+The embedding and Whisper/EasyOCR weights must already be in the local model cache.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Settings needed to import the app, without a database or API keys
+_vector_dir = tempfile.mkdtemp(prefix="bench_vector_store_")
+for key, value in {
+    "DATABASE_URL": "sqlite:///bench.db",
+    "SECRET_KEY": "benchmark",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "SESSION_COOKIE_NAME": "benchmark",
+    "HUGGINGFACE_API_KEY": "offline",
+    "VECTOR_STORE_DIR": _vector_dir,
+}.items():
+    os.environ.setdefault(key, value)
+
+from app.core.config import SETTINGS  # noqa: E402
+from app.services.model_registry import registry  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_FILES = ROOT / "data" / "uploaded_documents"
+DEFAULT_OUTPUT_DIR = ROOT / "bench_results"
+BENCH_OWNER_ID = 0
+BENCH_ROLE = "student"
+
+QUERIES = [
+    "What is the main contribution of the paper?",
+    "How does multi-head attention work?",
+    "What is the role of financial management?",
+    "Explain capital budgeting.",
+    "What is supervised learning?",
+    "Which Python libraries are used for machine learning?",
+    "What are the key points of the news story?",
+    "Summarize the text in the image.",
+    "What is the BLEU score reported?",
+    "What are working capital decisions?",
+]
+
+
+def _load_stub_llm():
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    return FakeListChatModel(responses=["This is a stub answer used for offline benchmarking."])
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its (pool) children, in MB."""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+        "p50_ms": round(pick(0.50) * 1000, 3),
+        "p95_ms": round(pick(0.95) * 1000, 3),
+        "p99_ms": round(pick(0.99) * 1000, 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench_file(path, document_id):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from app.services.embedding_service import split_section
+    from app.services.extraction import extract_sections, extraction_stage
+    from app.services import vector_store
+
+    file_type = path.suffix.lower()
+    result = {"file": path.name, "file_type": file_type, "bytes": path.stat().st_size}
+
+    start = time.perf_counter()
+    sections = list(extract_sections(str(path), file_type))
+    result["extraction_seconds"] = round(time.perf_counter() - start, 4)
+    result["extraction_stage"] = extraction_stage(file_type)
+    result["sections"] = len(sections)
+    result["characters"] = sum(len(text or "") for _, text in sections)
+
+    start = time.perf_counter()
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=60, add_start_index=True)
+    chunks = [chunk for section, text in sections for chunk in split_section(text_splitter, section, text)]
+    result["chunking_seconds"] = round(time.perf_counter() - start, 4)
+    result["chunks"] = len(chunks)
+
+    start = time.perf_counter()
+    embeddings = registry.get("embedding").embed_documents([chunk.page_content for chunk in chunks])
+    result["embedding_seconds"] = round(time.perf_counter() - start, 4)
+
+    start = time.perf_counter()
+    ids = [f"{document_id}-{i}" for i in range(len(chunks))]
+    if chunks:
+        vector_store.add_chunks(chunks, ids, BENCH_OWNER_ID, BENCH_ROLE, document_id, embeddings=embeddings)
+    result["indexing_seconds"] = round(time.perf_counter() - start, 4)
+
+    if result["embedding_seconds"]:
+        result["chunks_per_second"] = round(len(chunks) / result["embedding_seconds"], 2)
+    if file_type == ".pdf" and result["extraction_seconds"]:
+        result["pages_per_second"] = round(len(sections) / result["extraction_seconds"], 2)
+    if result["extraction_stage"] == "transcription" and sections and result["extraction_seconds"]:
+        audio_seconds = max(section["end_seconds"] for section, _ in sections)
+        result["audio_seconds"] = audio_seconds
+        result["audio_seconds_per_second"] = round(audio_seconds / result["extraction_seconds"], 2)
+    return result
+
+
+def bench_retrieval(query_count):
+    from app.services import vector_store
+    from app.services.rag_service import role_based_answer
+    from app.services.cache import answer_cache, query_embedding_cache
+
+    queries = [QUERIES[i % len(QUERIES)] + ("" if i < len(QUERIES) else f" ({i})") for i in range(query_count)]
+    search_times, answer_times = [], []
+    for query in queries:
+        start = time.perf_counter()
+        vector_store.search(query, BENCH_OWNER_ID, BENCH_ROLE, k=3)
+        search_times.append(time.perf_counter() - start)
+
+    # End-to-end answers with the stub LLM, caches cleared so every query is cold
+    answer_cache.clear()
+    query_embedding_cache.clear()
+    for query in queries:
+        start = time.perf_counter()
+        role_based_answer(query, BENCH_ROLE, BENCH_OWNER_ID)
+        answer_times.append(time.perf_counter() - start)
+
+    return {"vector_search": percentiles(search_times), "answer_stub_llm": percentiles(answer_times)}
+
+
+def summarize(files):
+    totals = {}
+    for key in ("extraction_seconds", "chunking_seconds", "embedding_seconds", "indexing_seconds", "chunks"):
+        totals[key] = round(sum(f.get(key, 0) for f in files), 4)
+    if totals["embedding_seconds"]:
+        totals["chunks_per_second"] = round(totals["chunks"] / totals["embedding_seconds"], 2)
+    return totals
+
+
+def compare(current, baseline_path):
+    baseline = json.loads(Path(baseline_path).read_text())
+    print(f"\nComparison with {baseline.get('commit')} ({baseline_path}):")
+    rows = [(f"totals.{k}", baseline["totals"].get(k), v) for k, v in current["totals"].items()]
+    for name, stats in current["retrieval"].items():
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            rows.append((f"{name}.{key}", baseline["retrieval"].get(name, {}).get(key), stats.get(key)))
+    rows.append(("peak_rss_mb.self", baseline["peak_rss_mb"]["self"], current["peak_rss_mb"]["self"]))
+    for name, old, new in rows:
+        if isinstance(old, (int, float)) and isinstance(new, (int, float)) and old:
+            print(f"  {name:40} {old:>12} -> {new:>12}  ({(new - old) / old:+.1%})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", default=str(DEFAULT_FILES), help="Directory of sample documents")
+    parser.add_argument("--skip-audio", action="store_true", help="Skip transcription of audio files")
+    parser.add_argument("--skip-images", action="store_true", help="Skip OCR of image files")
+    parser.add_argument("--queries", type=int, default=50, help="Number of retrieval queries")
+    parser.add_argument("--output", help="Results file (default bench_results/<commit>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    from app.services.extraction import AUDIO_EXTENSIONS, IMAGE_EXTENSIONS
+    registry.register("llm", _load_stub_llm)
+
+    skipped = set(AUDIO_EXTENSIONS if args.skip_audio else []) | set(IMAGE_EXTENSIONS if args.skip_images else [])
+    supported = set(AUDIO_EXTENSIONS) | set(IMAGE_EXTENSIONS) | {".pdf"}
+    paths = sorted(
+        p for p in Path(args.files).iterdir()
+        if p.suffix.lower() in supported and p.suffix.lower() not in skipped
+    )
+
+    start = time.perf_counter()
+    registry.warmup(["embedding", "vector_backend"])
+    model_load_seconds = round(time.perf_counter() - start, 3)
+
+    files = []
+    for index, path in enumerate(paths):
+        print(f"[{index + 1}/{len(paths)}] {path.name}", flush=True)
+        files.append(bench_file(path, f"bench-{index}"))
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            key: getattr(SETTINGS, key) for key in (
+                "embedding_model", "whisper_model", "embedding_batching", "embedding_batch_max_size",
+                "pdf_workers", "ocr_engine_mode", "ocr_workers", "transcription_workers", "retrieval_mode", "vector_backend",
+            )
+        },
+        "model_load_seconds": model_load_seconds,
+        "models": registry.status(),
+        "files": files,
+        "totals": summarize(files),
+        "retrieval": bench_retrieval(args.queries),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"{results['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, default=str))
+
+    print(json.dumps({k: results[k] for k in ("totals", "retrieval", "peak_rss_mb")}, indent=2))
+    print(f"Results written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark of the vector backends on synthetic MiniLM-sized embeddings.
+
+Builds the same collection with Chroma and with the memory-mapped backend
+(float16 and int8, exact and IVF), then reports build time, disk size, cold
+open-to-first-result time, query latency and recall@k against exact float32
+search:
+
+    python -m benchmarks.vector_backends
+    python -m benchmarks.vector_backends --rows 200000 --ivf-lists 256 --output bench_results/vectors.json
+
+No models are needed; the vectors are random unit vectors in --dim dimensions.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.pipeline import DEFAULT_OUTPUT_DIR, git_commit, peak_rss_mb, percentiles  # sets offline env defaults
+
+import numpy as np  # noqa: E402
+from app.core.config import SETTINGS  # noqa: E402
+from app.services.mmap_index import MmapBackend, normalize  # noqa: E402
+from app.services.vector_backends import ChromaBackend  # noqa: E402
+
+COLLECTION = "bench"
+OWNER_ID = 0
+
+
+def synthetic(rows, dim, seed=0):
+    # Clustered vectors, closer to real embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, rows // 200), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), rows)] + 0.35 * rng.normal(size=(rows, dim)).astype(np.float32)
+    return normalize(vectors)
+
+
+def disk_mb(path):
+    total = sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+    return round(total / (1024 * 1024), 2)
+
+
+def make_backend(kind, directory):
+    if kind == "chroma":
+        import chromadb
+        return ChromaBackend(chromadb.PersistentClient(path=directory), directory=directory)
+    return MmapBackend(directory)
+
+
+def bench_variant(name, kind, vectors, queries, truth, k, batch_size, settings):
+    for key, value in settings.items():
+        setattr(SETTINGS, key, value)
+    directory = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    try:
+        backend = make_backend(kind, directory)
+        ids = [f"chunk-{i}" for i in range(len(vectors))]
+        start = time.perf_counter()
+        for offset in range(0, len(vectors), batch_size):
+            batch = slice(offset, offset + batch_size)
+            backend.add(
+                COLLECTION, ids[batch], [f"text {i}" for i in range(offset, offset + len(ids[batch]))],
+                [{"owner_id": OWNER_ID, "chunk_id": chunk_id} for chunk_id in ids[batch]],
+                vectors[batch].tolist() if kind == "chroma" else vectors[batch],
+            )
+        build_seconds = time.perf_counter() - start
+        del backend
+
+        # Cold start: a fresh backend instance, as in a newly started worker
+        start = time.perf_counter()
+        backend = make_backend(kind, directory)
+        backend.search(COLLECTION, queries[0].tolist(), k, {"owner_id": OWNER_ID})
+        open_seconds = time.perf_counter() - start
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            results = backend.search(COLLECTION, query.tolist(), k, {"owner_id": OWNER_ID})
+            latencies.append(time.perf_counter() - start)
+            found = {int(doc.metadata["chunk_id"].split("-")[1]) for doc, _ in results}
+            hits += len(found & set(expected.tolist()))
+
+        return {
+            "variant": name,
+            "build_seconds": round(build_seconds, 3),
+            "disk_mb": disk_mb(directory),
+            "open_to_first_result_ms": round(open_seconds * 1000, 3),
+            "query": percentiles(latencies),
+            f"recall@{k}": round(hits / (len(queries) * k), 4),
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--ivf-lists", type=int, default=128)
+    parser.add_argument("--ivf-probes", type=int, default=8)
+    parser.add_argument("--skip-chroma", action="store_true")
+    parser.add_argument("--output", help="Results file (default bench_results/vectors-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    vectors = synthetic(args.rows, args.dim)
+    queries = normalize(vectors[np.random.default_rng(1).choice(args.rows, args.queries)] + 0.05)
+    truth = [np.argsort(-(vectors @ query))[:args.k] for query in queries]
+
+    exact = {"mmap_ivf_lists": 0}
+    ivf = {"mmap_ivf_lists": args.ivf_lists, "mmap_ivf_probes": args.ivf_probes, "mmap_ivf_min_rows": 0}
+    variants = [
+        ("mmap_float16_exact", "mmap", dict(exact, mmap_dtype="float16")),
+        ("mmap_int8_exact", "mmap", dict(exact, mmap_dtype="int8")),
+        ("mmap_int8_ivf", "mmap", dict(ivf, mmap_dtype="int8")),
+    ]
+    if not args.skip_chroma:
+        variants.insert(0, ("chroma_hnsw", "chroma", {}))
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "cpu_count": os.cpu_count(),
+        "rows": args.rows,
+        "dim": args.dim,
+        "k": args.k,
+        "variants": [],
+    }
+    for name, kind, settings in variants:
+        print(f"{name} ...", flush=True)
+        results["variants"].append(
+            bench_variant(name, kind, vectors, queries, truth, args.k, args.batch_size, settings)
+        )
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR / f"vectors-{results['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    for variant in results["variants"]:
+        print(
+            f"  {variant['variant']:20} build {variant['build_seconds']:>8}s  disk {variant['disk_mb']:>8}MB  "
+            f"open {variant['open_to_first_result_ms']:>9}ms  p50 {variant['query'].get('p50_ms')}ms  "
+            f"p95 {variant['query'].get('p95_ms')}ms  recall@{args.k} {variant[f'recall@{args.k}']}"
+        )
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
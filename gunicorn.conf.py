@@ -0,0 +1,51 @@
+"""
+Production server: gunicorn master with uvicorn workers.
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+The app and the fork-safe models (see ModelRegistry.preload) are loaded once in
+the master, then workers are forked and share the weights copy-on-write. One
+worker runs by default; more (SERVER_WORKERS) require VECTOR_BACKEND=mmap, since
+Chroma's persistent client cannot be shared by several processes (the process
+that opens the Chroma store locks it, and any other fails to open it). Job status is
+shared through JOB_STORE, but jobs run in the worker that accepted them, so
+recycling workers (SERVER_MAX_REQUESTS) is off by default: a recycled worker's
+jobs fail if they outlast SERVER_GRACEFUL_TIMEOUT.
+"""
+import os
+import shutil
+import tempfile
+
+# Prometheus metrics are aggregated across workers through this directory; it must
+# be set before prometheus_client is first imported, and start out empty
+multiproc_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "fastapi-ai-agent-metrics"))
+shutil.rmtree(multiproc_dir, ignore_errors=True)
+os.makedirs(multiproc_dir, exist_ok=True)
+
+from app.core import server  # noqa: E402
+from app.core.config import SETTINGS  # noqa: E402
+
+bind = SETTINGS.server_bind
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = server.worker_count()
+preload_app = True
+timeout = SETTINGS.server_timeout
+graceful_timeout = SETTINGS.server_graceful_timeout
+max_requests = SETTINGS.server_max_requests
+max_requests_jitter = SETTINGS.server_max_requests_jitter
+keepalive = 5
+accesslog = "-"
+
+
+def when_ready(arbiter):
+    # After the app is preloaded, before the first worker is forked
+    server.preload()
+
+
+def post_fork(arbiter, worker):
+    server.after_fork()
+
+
+def child_exit(arbiter, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -9,14 +9,23 @@ source venv/bin/activate
 # Install dependencies
 pip install -r requirements.txt
 
-# Start FastAPI backend
-nohup uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload &
+# Optional: a shared inference worker owning the OCR, whisper and embedding models
+# (the API uses it when INFERENCE_WORKER_SOCKET is set)
+if [ -n "$INFERENCE_WORKER_SOCKET" ]; then
+    nohup python -m app.services.inference_worker &
+fi
+
+# Start FastAPI backend: models are loaded once, then SERVER_WORKERS workers are forked.
+# With the default Chroma vector store only one process may open data/vector_store, so
+# keep SERVER_WORKERS=1 (and stop the API before running app.bulk_ingest); several
+# workers need VECTOR_BACKEND=mmap
+nohup gunicorn app.main:app -c gunicorn.conf.py &
 
 # Start Streamlit frontend
 nohup streamlit run frontend/app.py --server.port 8501 --server.address 0.0.0.0 &
 
 # Confirm that the servers are running
-ps aux | grep uvicorn
+ps aux | grep gunicorn
 ps aux | grep streamlit
 
 echo "FastAPI and Streamlit started successfully!"